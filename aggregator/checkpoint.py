@@ -0,0 +1,143 @@
+import os
+import pickle
+import sys
+import typing
+
+from input.cache import log_digest
+from input.compress import compression, magic_size
+from input.log import SingleReader
+from input.source import LineSource
+from lib.filter import FilterOptions
+from line.log import LogLine, RawLine
+
+
+class FilePosition(object):
+    # how far a log file is analyzed: offset of the first line that isn't, and what is needed
+    # to tell that the file is still the same (not rotated, truncated or rewritten)
+    path: str
+    offset: int
+    identity: typing.Optional[typing.Tuple[int, int]]
+    size: int
+    mtime: int
+    digest: bytes
+    compressed: bool
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.identity = None
+        self.size = 0
+        self.mtime = 0
+        self.digest = b''
+        self.compressed = False
+
+    def is_valid(self) -> bool:
+        try:
+            with open(self.path, 'rb') as inp:
+                stat = os.fstat(inp.fileno())
+                if (stat.st_dev, stat.st_ino) != self.identity:
+                    return False
+                if self.compressed:
+                    # compressed logs don't grow, they are read whole
+                    return stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+                return stat.st_size >= self.offset and log_digest(inp, self.offset) == self.digest
+        except OSError:
+            return False
+
+    def read(self, reader: SingleReader) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        with open(self.path, 'rb') as inp:
+            stat = os.fstat(inp.fileno())
+            self.compressed = compression(inp.peek(magic_size)[:magic_size]) is not None
+            if self.compressed and self.identity is not None:
+                return None
+
+            inp.seek(0 if self.compressed else self.offset)
+            for raw_line in LineSource(inp):
+                if not self.compressed and not raw_line.endswith(b'\n'):
+                    # unfinished last line of a growing log, it's analyzed next time
+                    break
+                self.offset += len(raw_line)
+                line = reader.parse_line(raw_line)
+                if line is not None:
+                    yield line
+
+            self.identity = (stat.st_dev, stat.st_ino)
+            self.size = stat.st_size
+            self.mtime = stat.st_mtime_ns
+            if not self.compressed:
+                self.digest = log_digest(inp, self.offset)
+
+
+class ResumedReader(object):
+    # reader of a log (segments of it, see group_logfiles) from where it was analyzed till
+    positions: typing.Sequence[FilePosition]
+
+    def __init__(self, positions: typing.Sequence[FilePosition], filter_options: FilterOptions, **kwargs):
+        self.positions = positions
+        self.reader = SingleReader(None, filter_options, **kwargs)
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        for position in self.positions:
+            yield from position.read(self.reader)
+
+
+class Checkpoint(object):
+    # state of an analyzer along with positions of log files it's got to, so that the next run
+    # analyzes only the lines added since; settings are whatever changes what lines analyzer
+    # gets (e.g. filters), everything is analyzed again if they are different
+    version = 1
+
+    path: str
+    settings: typing.Any
+    positions: typing.Dict[str, FilePosition]
+    analyzer: typing.Any
+
+    def __init__(self, path: str, settings: typing.Any):
+        self.path = path
+        self.settings = settings
+        self.positions = {}
+        self.analyzer = None
+
+    @staticmethod
+    def load(path: str, settings: typing.Any, debug: bool = False) -> 'Checkpoint':
+        checkpoint = Checkpoint(path, settings)
+        try:
+            with open(path, 'rb') as inp:
+                version, saved_settings, positions, analyzer = pickle.load(inp)
+        except FileNotFoundError:
+            return checkpoint
+        except Exception as e:
+            if debug:
+                print("failed to load checkpoint '%s': %s" % (path, str(e)), file=sys.stderr)
+            return checkpoint
+
+        if version == Checkpoint.version and saved_settings == settings:
+            checkpoint.positions = positions
+            checkpoint.analyzer = analyzer
+        return checkpoint
+
+    def resume(self, log_files: typing.Collection[str], debug: bool = False) -> bool:
+        # True if the analyzer continues from the checkpoint, otherwise files are read from the start
+        for path, position in self.positions.items():
+            if path not in log_files or not position.is_valid():
+                if debug:
+                    print("'%s' is rotated or truncated, analyzing everything again" % path, file=sys.stderr)
+                self.positions = {}
+                self.analyzer = None
+                break
+
+        for path in log_files:
+            if path not in self.positions:
+                self.positions[path] = FilePosition(path)
+        return self.analyzer is not None
+
+    def readers(self, groups: typing.Iterable[typing.Sequence[str]], filter_options: FilterOptions,
+                **kwargs) -> typing.List[ResumedReader]:
+        return [ResumedReader([self.positions[path] for path in paths], filter_options, **kwargs) for paths in groups]
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            pickle.dump((self.version, self.settings, self.positions, self.analyzer), out,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
@@ -1,7 +1,11 @@
+import collections
+import functools
+import multiprocessing
 import typing
 from datetime import datetime, timedelta
 from enum import Enum
 
+from input.test import TestReader
 from line.test import TestCommonEvent, TestRunEvent, TestOutputEvent, TestPassEvent, TestFailEvent, TestEvent, \
     TestContinueEvent, TestPauseEvent, TestSkipEvent
 
@@ -13,10 +17,15 @@ class Status(Enum):
     Skip = 4
 
 
+# status of a package made of several parts is the most important one of them
+_status_rank = {Status.Unknown: 0, Status.Skip: 1, Status.Pass: 2, Status.Fail: 3}
+
+
 class Run(object):
-    name:   str
-    status: Status
-    output: typing.List[str]
+    name:    str
+    status:  Status
+    output:  typing.MutableSequence[str]
+    dropped: int
 
     paused:    float
     paused_at: typing.Optional[datetime]
@@ -25,10 +34,13 @@ class Run(object):
     finished_at: datetime
     elapsed:     float
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, max_output: int = 0):
         self.name = name
         self.status = Status.Unknown
-        self.output = list()
+        # with max_output only that many last lines are kept, the rest are counted as dropped
+        self.max_output = max_output
+        self.output = collections.deque(maxlen=max_output) if max_output > 0 else list()
+        self.dropped = 0
 
         self.paused = 0
         self.paused_at = None
@@ -37,6 +49,11 @@ class Run(object):
         self.finished_at = None
         self.elapsed = 0
 
+    def add_output(self, line: str):
+        if self.max_output > 0 and len(self.output) == self.max_output:
+            self.dropped += 1
+        self.output.append(line)
+
     def is_finished(self) -> bool:
         return self.status is not Status.Unknown
 
@@ -77,9 +94,10 @@ class Test(object):
     name: str
     runs: typing.List[Run]
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, max_output: int = 0):
         self.name = name
         self.runs = list()
+        self.max_output = max_output
 
     def last_run(self) -> Run:
         return self.runs[len(self.runs) - 1]
@@ -98,7 +116,7 @@ class Test(object):
                 raise TestIsPaused()
 
         if isinstance(event, TestRunEvent):
-            self.runs.append(Run(self.name))
+            self.runs.append(Run(self.name, self.max_output))
         elif isinstance(event, TestPauseEvent):
             self.last_run().paused_at = event.time
         elif isinstance(event, TestContinueEvent):
@@ -114,7 +132,7 @@ class Test(object):
             last_run.status = Status.Fail
             last_run.finished_at = event.time
         elif isinstance(event, TestOutputEvent):
-            self.last_run().output.append(event.message.strip())
+            self.last_run().add_output(event.message.strip())
         elif isinstance(event, TestSkipEvent):
             last_run = self.last_run()
             last_run.status = Status.Skip
@@ -130,17 +148,18 @@ class PackageAlreadyFinished(Exception):
 
 class Package(object):
     name:    str
-    output:  typing.List[str]
+    output:  typing.MutableSequence[str]
     tests:   typing.Dict[str, Test]
     status:  Status
     elapsed: float
 
-    def __init__(self, name):
+    def __init__(self, name, max_output: int = 0):
         self.name = name
-        self.output = list()
+        self.output = collections.deque(maxlen=max_output) if max_output > 0 else list()
         self.tests = dict()
         self.status = Status.Unknown
         self.elapsed = 0
+        self.max_output = max_output
 
     def add_event(self, event: TestEvent):
         if isinstance(event, TestFailEvent) and event.test is None:
@@ -167,11 +186,23 @@ class Package(object):
             test = self.obtain_test(test_name, True)
             test.add_event(event)
 
+    def merge(self, other: 'Package'):
+        # tests of the package that were run separately (e.g. shards of them)
+        self.output.extend(other.output)
+        for test_name, test in other.tests.items():
+            if test_name in self.tests:
+                self.tests[test_name].runs.extend(test.runs)
+            else:
+                self.tests[test_name] = test
+        if _status_rank[other.status] > _status_rank[self.status]:
+            self.status = other.status
+        self.elapsed += other.elapsed
+
     def obtain_test(self, test_name: str, required: bool) -> Test:
         if test_name not in self.tests:
             if required:
                 raise NotImplementedError()
-            self.tests[test_name] = Test(test_name)
+            self.tests[test_name] = Test(test_name, self.max_output)
         return self.tests[test_name]
 
 
@@ -190,6 +221,14 @@ class OverallInformation(object):
         package = self.obtain_package(event.package)
         package.add_event(event)
 
+    def merge(self, other: 'OverallInformation'):
+        # packages are independent of each other, so information of separate inputs is merged by package
+        for package_name, package in other.package_list.items():
+            if package_name in self.package_list:
+                self.package_list[package_name].merge(package)
+            else:
+                self.package_list[package_name] = package
+
     def brief_failed(self) -> typing.List[Run]:
         rv = list()
         for package_name, package in self.package_list.items():
@@ -199,3 +238,105 @@ class OverallInformation(object):
                         rv.append(run)
         return rv
 
+
+class StreamingInformation(OverallInformation):
+    # failed runs are passed to on_failed as soon as they fail, finished tests and packages are
+    # dropped, so memory depends on tests in flight and max_output (lines kept of every run)
+    # rather than on the whole output
+    on_failed: typing.Callable[[Run], None]
+    max_output: int
+
+    def __init__(self, on_failed: typing.Callable[[Run], None], max_output: int = 0):
+        super(StreamingInformation, self).__init__()
+        self.on_failed = on_failed
+        self.max_output = max_output
+
+    def obtain_package(self, package_name):
+        if package_name not in self.package_list:
+            self.package_list[package_name] = Package(package_name, self.max_output)
+        return self.package_list[package_name]
+
+    def add_event(self, event: TestEvent):
+        package = self.obtain_package(event.package)
+        package.add_event(event)
+
+        if not isinstance(event, (TestPassEvent, TestFailEvent, TestSkipEvent)):
+            return None
+        if event.test is None:
+            self.finish_package(package)
+            return None
+
+        test = package.tests[event.test]
+        if isinstance(event, TestFailEvent):
+            self.on_failed(test.last_run())
+        # next run of the test (-count) starts a new one
+        del package.tests[event.test]
+
+    def finish_package(self, package: Package):
+        # tests that are still running when their package is over (e.g. after a panic)
+        for test in package.tests.values():
+            for run in test.runs:
+                if run.is_failed():
+                    self.on_failed(run)
+        del self.package_list[package.name]
+
+    def finish(self):
+        # input is over, packages that are left are never going to finish
+        for package in list(self.package_list.values()):
+            self.finish_package(package)
+
+
+def _aggregate_file(path: str, streaming: bool, max_output: int, reader_kwargs: typing.Dict[str, typing.Any]) -> \
+        typing.Union[OverallInformation, typing.List[Run]]:
+    with open(path, 'rb') as inp:
+        events = TestReader(inp, **reader_kwargs).read_generator()
+        if not streaming:
+            info = OverallInformation()
+            for event in events:
+                info.add_event(event)
+            return info
+
+        failed = []
+        info = StreamingInformation(failed.append, max_output)
+        for event in events:
+            info.add_event(event)
+        info.finish()
+        return failed
+
+
+class TestFiles(object):
+    # go test -json outputs (one per package or shard of packages), a process per file parses
+    # and aggregates it, results are merged by package
+    paths: typing.Sequence[str]
+    jobs: int
+
+    def __init__(self, paths: typing.Sequence[str], jobs: int = 1, **kwargs):
+        self.paths = paths
+        self.jobs = jobs
+        self.kwargs = kwargs
+
+    def _results(self, streaming: bool, max_output: int, ordered: bool) -> typing.Iterator[typing.Any]:
+        aggregate = functools.partial(_aggregate_file, streaming=streaming, max_output=max_output,
+                                      reader_kwargs=self.kwargs)
+        jobs = min(self.jobs, len(self.paths))
+        if jobs <= 1:
+            yield from map(aggregate, self.paths)
+            return None
+
+        with multiprocessing.Pool(jobs) as pool:
+            if ordered:
+                yield from pool.imap(aggregate, self.paths)
+            else:
+                yield from pool.imap_unordered(aggregate, self.paths)
+
+    def information(self) -> OverallInformation:
+        # packages go in the order of files
+        info = OverallInformation()
+        for other in self._results(False, 0, True):
+            info.merge(other)
+        return info
+
+    def failed(self, max_output: int = 0) -> typing.Generator[Run, None, None]:
+        # failed runs of every file once the file is done, files that are done first go first
+        for runs in self._results(True, max_output, False):
+            yield from runs
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+# run from the repository root: python3 -m bench.extractor
+
+import argparse
+import sys
+import timeit
+
+from line.extractor import LineExtractor
+
+json_line = '{"level":"info","nodeid":"insolar:1AAEAAbJmTQFZcvN0Vtx4pwdDTyCAQXcA5mKC2Qta1Jk","role":"virtual",' \
+            '"time":"2019-09-10T15:04:05.035223123+03:00","caller":"insolar/bus/bus.go:317",' \
+            '"message":"Incoming request: {\\"method\\": \\"Call\\"}","traceid":"7a4b3c9d-1e2f-4a5b-8c7d-6e5f4a3b2c1d",' \
+            '"pulse":65537}'
+
+formats = {
+    'host': ['2019-09-10T15:04:05Z host-12 insolard[1234]: %s\n'],
+    'insolard': ['2019-09-10T15:04:05Z 3/insolard_virtual.log %s\n'],
+    'dir-line': ['12/output.log:345:%s\n'],
+    'dir': ['12/output.log:%s\n'],
+    'json': ['%s\n'],
+    # log lines followed by backtraces, format is detected again after every raw line
+    'json+raw': ['%s\n', 'goroutine 1 [running]:\n', '\tinsolar/bus/bus.go:317 +0x1d\n'],
+}
+
+
+class RegexpLine(object):
+    def __init__(self, instance, json_line):
+        self.instance = instance
+        self.json_line = json_line
+
+
+class RegexpExtractor(object):
+    # LineExtractor as it was before: remembered regexp, search on every line
+    re = [line_format.regexp for line_format in LineExtractor.formats]
+
+    def __init__(self):
+        self.extractor = None
+
+    @staticmethod
+    def _deduce_extractor(line):
+        for line_regexp in RegexpExtractor.re:
+            match = line_regexp.search(line)
+            if match is not None:
+                return line_regexp
+        return None
+
+    def __call__(self, raw_line):
+        if self.extractor is None:
+            self.extractor = self._deduce_extractor(raw_line)
+        if self.extractor is None:
+            return None
+        match = self.extractor.search(raw_line)
+        if match is None:
+            self.extractor = self._deduce_extractor(raw_line)
+            if self.extractor is None:
+                return None
+            match = self.extractor.search(raw_line)
+            if match is None:
+                return None
+        return RegexpLine(match.group(1), match.group(2))
+
+
+def extract_regexp(lines):
+    extractor = RegexpExtractor()
+    for line in lines:
+        extractor(line)
+
+
+def extract(lines):
+    extractor = LineExtractor()
+    for line in lines:
+        extractor(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='LineExtractor microbenchmark')
+    parser.add_argument('--lines', type=int, default=100000, help='lines per format')
+    parser.add_argument('--repeat', type=int, default=5, help='best of N runs')
+    args = parser.parse_args()
+
+    print('%-10s %14s %14s %8s' % ('format', 'regexp, l/s', 'extractor, l/s', 'speedup'))
+    for name, templates in formats.items():
+        lines = [template.replace('%s', json_line) for template in templates] * (args.lines // len(templates))
+        # runs take turns, so that a slow moment of the machine doesn't go to one of them only
+        regexp, fast = None, None
+        for _ in range(args.repeat):
+            elapsed = timeit.timeit(lambda: extract_regexp(lines), number=1)
+            regexp = elapsed if regexp is None else min(regexp, elapsed)
+            elapsed = timeit.timeit(lambda: extract(lines), number=1)
+            fast = elapsed if fast is None else min(fast, elapsed)
+        print('%-10s %14.0f %14.0f %7.1fx' % (name, args.lines / regexp, args.lines / fast, regexp / fast))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
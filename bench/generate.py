@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# run from the repository root: python3 -m bench.generate --out /tmp/logs
+#
+# deterministic (same arguments, same bytes) synthetic insolar logs, one file per node,
+# and a `go test -json` stream of the same run
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import typing
+
+# prefixes every LineExtractor format comes with
+formats = {
+    'host': '{time} host-{instance} insolard[1234]: {json}\n',
+    'insolard': '{time} {instance}/insolard_virtual.log {json}\n',
+    'dir-line': '{instance}/output.log:{lineno}:{json}\n',
+    'dir': '{instance}/output.log:{json}\n',
+    'json': '{json}\n',
+}
+
+levels = ['debug'] * 6 + ['info'] * 3 + ['warn', 'error']
+roles = ['virtual', 'light_material', 'heavy_material']
+messages = [
+    'Incoming request: {{"method": "Call{0}"}}',
+    'state machine {0} moved to the next step',
+    'message {0} is sent',
+    'pulse changed to {0}',
+    'failed to get object {0}: timeout',
+]
+backtrace = 'goroutine {0} [running]:\nmain.main()\n\t/go/src/insolar/cmd/insolard/main.go:{0} +0x{0:x}\n'
+
+start = datetime.datetime(2019, 9, 10, 15, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=3)))
+
+
+def _time(value: datetime.datetime, nanoseconds: int) -> str:
+    # go writes nanoseconds, python can't
+    return value.strftime('%Y-%m-%dT%H:%M:%S') + '.%06d%03d' % (value.microsecond, nanoseconds) + '+03:00'
+
+
+def _json(items: typing.Sequence[typing.Tuple[str, typing.Any]]) -> str:
+    # written by hand to be able to write duplicated keys, as zerolog does
+    return '{' + ','.join('%s:%s' % (json.dumps(key), json.dumps(value)) for key, value in items) + '}'
+
+
+def log_line(rnd: random.Random, node: int, time: str, pulse: int, args) -> str:
+    trace = rnd.randrange(args.traceids)
+    message = rnd.choice(messages).format(rnd.randrange(1000))
+    items = [
+        ('level', rnd.choice(levels)),
+        ('nodeid', 'insolar:1AAEAA%05d' % node),
+        ('role', roles[node % len(roles)]),
+        ('time', time),
+        ('caller', 'insolar/pkg%d/file%d.go:%d' % (rnd.randrange(20), rnd.randrange(10), rnd.randrange(1, 500))),
+        ('message', message),
+        ('traceid', 'trace-%08x' % trace),
+        ('pulse', pulse),
+        ('loginstance', 'node'),
+        ('writeDuration', '%dus' % rnd.randrange(1, 100)),
+    ]
+    for i in range(args.fields):
+        items.append(('field%d' % i, rnd.choice(['value %d' % rnd.randrange(100), rnd.randrange(100000), True])))
+    if message.startswith('Incoming request'):
+        items.append(('callSite', 'Call%d' % rnd.randrange(10)))
+    if rnd.random() < args.duplicates:
+        items.append(('field0' if args.fields > 0 else 'traceid', 'duplicate %d' % rnd.randrange(10)))
+    return _json(items)
+
+
+def write_logs(args):
+    rnd = random.Random(args.seed)
+    template = formats[args.format]
+    time = start
+    pulse = 65537
+    outputs = [open(os.path.join(args.out, 'node%d.log' % node), 'w') for node in range(args.nodes)]
+    try:
+        for lineno in range(args.lines):
+            time += datetime.timedelta(microseconds=rnd.randrange(1, 200))
+            if lineno % 10000 == 9999:
+                pulse += 1
+            node = rnd.randrange(args.nodes)
+            text = template.format(time=time.strftime('%Y-%m-%dT%H:%M:%SZ'), instance=node + 1, lineno=lineno + 1,
+                                   json=log_line(rnd, node, _time(time, rnd.randrange(1000)), pulse, args))
+            if rnd.random() < args.backtraces:
+                text += backtrace.format(rnd.randrange(1, 1000))
+            outputs[node].write(text)
+    finally:
+        for out in outputs:
+            out.close()
+
+
+def test_event(time: datetime.datetime, action: str, package: str, test: typing.Optional[str] = None,
+               **kwargs) -> str:
+    event = {'Time': _time(time, 0), 'Action': action, 'Package': package}
+    if test is not None:
+        event['Test'] = test
+    event.update(kwargs)
+    return json.dumps(event) + '\n'
+
+
+def write_tests(args):
+    # go test -json of packages with tests that pass, fail, skip and get paused by t.Parallel()
+    rnd = random.Random(args.seed)
+    time = start
+    with open(os.path.join(args.out, 'tests.json'), 'w') as out:
+        for package_index in range(args.packages):
+            package = 'github.com/insolar/insolar/pkg%d' % package_index
+            failed = False
+            for test_index in range(args.tests):
+                test = 'Test%d_%d' % (package_index, test_index)
+                out.write(test_event(time, 'run', package, test))
+                if rnd.random() < 0.2:
+                    out.write(test_event(time, 'pause', package, test))
+                    out.write(test_event(time, 'cont', package, test))
+                for _ in range(rnd.randrange(args.output)):
+                    time += datetime.timedelta(microseconds=rnd.randrange(1, 2000))
+                    out.write(test_event(time, 'output', package, test,
+                                         Output='    log line %d\n' % rnd.randrange(1000)))
+
+                elapsed = rnd.randrange(1, 1000) / 100
+                action = rnd.choice(['pass'] * 8 + ['fail', 'skip'])
+                failed = failed or action == 'fail'
+                word = {'pass': 'PASS', 'fail': 'FAIL', 'skip': 'SKIP'}[action]
+                out.write(test_event(time, 'output', package, test,
+                                     Output='--- %s: %s (%.2fs)\n' % (word, test, elapsed)))
+                out.write(test_event(time, action, package, test, Elapsed=elapsed))
+
+            out.write(test_event(time, 'output', package, Output='FAIL\n' if failed else 'PASS\n'))
+            out.write(test_event(time, 'fail' if failed else 'pass', package, Elapsed=rnd.randrange(1, 100)))
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    # everything but --out, for scripts that generate logs on their own
+    parser.add_argument('--format', choices=sorted(formats), default='json', help='line prefix format')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--lines', type=int, default=100000, help='log lines of all the nodes')
+    parser.add_argument('--nodes', type=int, default=5, help='number of nodes (log files)')
+    parser.add_argument('--fields', type=int, default=3, help='extra fields in every line')
+    parser.add_argument('--traceids', type=int, default=1000, help='number of distinct traceids')
+    parser.add_argument('--backtraces', type=float, default=0.01, help='share of lines followed by a backtrace')
+    parser.add_argument('--duplicates', type=float, default=0.01, help='share of lines with a duplicated key')
+    parser.add_argument('--packages', type=int, default=20, help='packages in the test output')
+    parser.add_argument('--tests', type=int, default=50, help='tests in every package')
+    parser.add_argument('--output', type=int, default=20, help='up to that many output lines of every test')
+
+
+def prepare_parser():
+    parser = argparse.ArgumentParser(description='Generate synthetic insolar logs and go test -json output')
+    parser.add_argument('--out', required=True, help='directory to write node<N>.log and tests.json to')
+    add_arguments(parser)
+    return parser
+
+
+def main() -> int:
+    args = prepare_parser().parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    write_logs(args)
+    write_tests(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+# run from the repository root: python3 -m bench.stages [--save baseline.json | --baseline baseline.json]
+#
+# lines/sec and peak memory of every stage of the reader pipeline and of the CLIs end to end,
+# on logs written by bench.generate. Numbers only make sense against a baseline taken on the
+# same machine with the same generator settings.
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+from aggregator.run import OverallInformation
+from bench import generate
+from input.common import json_loads, json_object_multiple_unique
+from input.source import LineSource
+from input.test import TestReader
+from lib.filter import FilterOptions
+from line.extractor import LineExtractor
+from line.log import LogLine
+from printer.log import Printer
+
+Stage = typing.Callable[[], int]
+
+
+def _best(stage: Stage, repeat: int) -> typing.Tuple[float, int]:
+    # best time of several runs and the number of lines one run went through
+    best, lines = None, 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        lines = stage()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, lines
+
+
+def _peak(stage: Stage) -> int:
+    # KiB allocated at the worst moment of a run, tracing slows everything down so it's a separate run
+    tracemalloc.start()
+    try:
+        stage()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Pipeline(object):
+    # every stage gets what the previous one made, it's prepared before the stage is measured
+    def __init__(self, log_files: typing.Sequence[str], tests_file: str, settings):
+        self.log_files = log_files
+        self.tests_file = tests_file
+        self.settings = settings
+        self.filter = FilterOptions(settings)
+
+        self.raw_lines = self.read()
+        self.text_lines = [raw_line.decode('utf-8', errors='replace') for raw_line in self.raw_lines]
+        self.json_lines = [line.json_line for line in map(LineExtractor(), self.text_lines) if line is not None]
+
+    def read(self) -> typing.List[bytes]:
+        rv = []
+        for log_file in self.log_files:
+            with open(log_file, 'rb') as inp:
+                rv.extend(LineSource(inp))
+        return rv
+
+    def stage_read(self) -> int:
+        return len(self.read())
+
+    def stage_extract(self) -> int:
+        extractor = LineExtractor()
+        for raw_line in self.raw_lines:
+            extractor(raw_line.decode('utf-8', errors='replace'))
+        return len(self.raw_lines)
+
+    def stage_json(self) -> int:
+        for json_line in self.json_lines:
+            json_loads(json_line)
+        return len(self.json_lines)
+
+    def stage_json_duplicates(self) -> int:
+        # the slow path every line used to take
+        for json_line in self.json_lines:
+            json.loads(json_line, object_pairs_hook=json_object_multiple_unique)
+        return len(self.json_lines)
+
+    def _log_lines(self) -> typing.List[LogLine]:
+        return [LogLine(json_loads(json_line)) for json_line in self.json_lines]
+
+    def stage_logline(self) -> int:
+        # json is decoded outside of the measured part
+        parsed = [json_loads(json_line) for json_line in self.json_lines]
+        started = time.perf_counter()
+        for line in parsed:
+            LogLine(line).timestamp_key
+        self.logline_time = time.perf_counter() - started
+        return len(parsed)
+
+    def stage_filter(self) -> int:
+        lines = self._log_lines()
+        filter_log_line = self.filter.filter_log_line
+        started = time.perf_counter()
+        for line in lines:
+            filter_log_line(line)
+        self.filter_time = time.perf_counter() - started
+        return len(lines)
+
+    def stage_render(self) -> int:
+        lines = self._log_lines()
+        printer = Printer(io.StringIO(), self.settings, self.filter)
+        started = time.perf_counter()
+        for line in lines:
+            printer.render_line(line)
+        self.render_time = time.perf_counter() - started
+        return len(lines)
+
+    def stage_tests(self) -> int:
+        info = OverallInformation()
+        count = 0
+        with open(self.tests_file, 'rb') as inp:
+            for event in TestReader(inp).read_generator():
+                info.add_event(event)
+                count += 1
+        info.brief_failed()
+        return count
+
+
+def measure_stages(pipeline: Pipeline, repeat: int) -> typing.Dict[str, typing.Dict[str, float]]:
+    stages = [
+        ('read', pipeline.stage_read, None),
+        ('extract', pipeline.stage_extract, None),
+        ('json', pipeline.stage_json, None),
+        ('json-duplicates', pipeline.stage_json_duplicates, None),
+        # these need objects of the previous stages, only the stage itself is timed
+        ('logline', pipeline.stage_logline, 'logline_time'),
+        ('filter', pipeline.stage_filter, 'filter_time'),
+        ('render', pipeline.stage_render, 'render_time'),
+        ('testreader', pipeline.stage_tests, None),
+    ]
+    rv = {}
+    for name, stage, inner_time in stages:
+        if inner_time is None:
+            elapsed, lines = _best(stage, repeat)
+        else:
+            elapsed, lines = None, 0
+            for _ in range(repeat):
+                lines = stage()
+                spent = getattr(pipeline, inner_time)
+                elapsed = spent if elapsed is None else min(elapsed, spent)
+        rv[name] = {'lines_per_sec': lines / elapsed if elapsed > 0 else 0.0, 'peak_kib': _peak(stage)}
+    return rv
+
+
+def _run(command: typing.Sequence[str], stdin: typing.Optional[str]) -> typing.Tuple[float, int]:
+    # wall time and peak RSS (KiB) of a command
+    # stderr goes to a file: nobody reads a pipe until the command is over, and it may write a lot
+    inp = open(stdin, 'rb') if stdin is not None else subprocess.DEVNULL
+    try:
+        with tempfile.TemporaryFile() as errors:
+            started = time.perf_counter()
+            process = subprocess.Popen(command, stdin=inp, stdout=subprocess.DEVNULL, stderr=errors)
+            _, status, usage = os.wait4(process.pid, 0)
+            elapsed = time.perf_counter() - started
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode != 0:
+                errors.seek(0)
+                raise RuntimeError("'%s' failed: %s" % (' '.join(command), errors.read().decode(errors='replace')))
+    finally:
+        if stdin is not None:
+            inp.close()
+    return elapsed, usage.ru_maxrss
+
+
+def measure_cli(log_dir: str, tests_file: str, lines: int, test_events: int, repeat: int) -> \
+        typing.Dict[str, typing.Dict[str, float]]:
+    python = sys.executable
+    commands = [
+        ('logparse', [python, 'logparse.py', log_dir], None, lines),
+        ('logparse-ndjson', [python, 'logparse.py', '--output', 'ndjson', log_dir], None, lines),
+        ('logparse-stdin-sort', [python, 'logparse.py', '--assume-sorted'], os.path.join(log_dir, 'node0.log'),
+         None),
+        ('smanalyze', [python, 'smanalyze.py', log_dir], None, lines),
+        ('testformatter', [python, 'testformatter.py'], tests_file, test_events),
+    ]
+    rv = {}
+    for name, command, stdin, count in commands:
+        if count is None:
+            with open(stdin, 'rb') as inp:
+                count = sum(1 for _ in inp)
+        best, peak = None, 0
+        for _ in range(repeat):
+            elapsed, rss = _run(command, stdin)
+            best = elapsed if best is None else min(best, elapsed)
+            peak = max(peak, rss)
+        rv['cli:' + name] = {'lines_per_sec': count / best, 'peak_kib': peak}
+    return rv
+
+
+def compare(results: typing.Dict[str, typing.Dict[str, float]], baseline: typing.Dict[str, typing.Any],
+            tolerance: float) -> bool:
+    # prints results next to the baseline, False if something got worse more than tolerance allows
+    ok = True
+    print('%-22s %14s %14s %8s %12s %12s %8s' % ('stage', 'lines/s', 'baseline', 'change', 'peak KiB', 'baseline',
+                                                  'change'))
+    for name, result in results.items():
+        base = baseline.get(name, None)
+        if base is None:
+            print('%-22s %14.0f %14s %8s %12d %12s %8s' % (name, result['lines_per_sec'], '-', '-',
+                                                           result['peak_kib'], '-', '-'))
+            continue
+
+        speed = result['lines_per_sec'] / base['lines_per_sec'] - 1 if base['lines_per_sec'] else 0.0
+        memory = result['peak_kib'] / base['peak_kib'] - 1 if base['peak_kib'] else 0.0
+        mark = ''
+        if speed < -tolerance or memory > tolerance:
+            ok = False
+            mark = '  REGRESSION'
+        print('%-22s %14.0f %14.0f %+7.1f%% %12d %12d %+7.1f%%%s' % (
+            name, result['lines_per_sec'], base['lines_per_sec'], speed * 100,
+            result['peak_kib'], base['peak_kib'], memory * 100, mark))
+    return ok
+
+
+def prepare_parser():
+    parser = argparse.ArgumentParser(description='Throughput and memory of the reader pipeline stages and of the CLIs')
+    parser.add_argument('--out', default=None, help='directory for generated logs, temporary one by default')
+    generate.add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='best of N runs')
+    parser.add_argument('--no-cli', action='store_true', default=False, help="don't run the CLIs")
+    parser.add_argument('--save', default=None, help='write results to the file as a baseline')
+    parser.add_argument('--baseline', default=None, help='compare results with the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative slowdown or memory growth that is reported as a regression')
+    return parser
+
+
+def main() -> int:
+    args = prepare_parser().parse_args()
+    generator_settings = {key: getattr(args, key) for key in (
+        'format', 'seed', 'lines', 'nodes', 'fields', 'traceids', 'backtraces', 'duplicates', 'packages', 'tests',
+        'output')}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.out is None:
+            args.out = tmp_dir
+        os.makedirs(args.out, exist_ok=True)
+        generate.write_logs(args)
+        generate.write_tests(args)
+
+        log_files = [os.path.join(args.out, 'node%d.log' % node) for node in range(args.nodes)]
+        tests_file = os.path.join(args.out, 'tests.json')
+
+        results = {}
+        if not args.no_cli:
+            # before the pipeline is in memory: a child counts the memory of the parent it's forked from
+            with open(tests_file, 'rb') as inp:
+                test_events = sum(1 for _ in inp)
+            results.update(measure_cli(args.out, tests_file, args.lines, test_events, args.repeat))
+
+        # the same settings logparse runs with by default
+        import logparse
+        settings = logparse.prepare_parser().parse_args([])
+        pipeline = Pipeline(log_files, tests_file, settings)
+        results = dict(measure_stages(pipeline, args.repeat), **results)
+
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as inp:
+            saved = json.load(inp)
+        if saved.get('settings', None) != generator_settings:
+            print('WARN: baseline was taken with other generator settings: %s' % saved.get('settings', None),
+                  file=sys.stderr)
+        baseline = saved.get('results', {})
+
+    ok = compare(results, baseline, args.tolerance)
+
+    if args.save is not None:
+        with open(args.save, 'w') as out:
+            json.dump({'settings': generator_settings, 'results': results}, out, indent=2, sort_keys=True)
+            out.write('\n')
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
 import collections
+import multiprocessing
 import os
-import subprocess
 import typing
 
 from lib.filter import FilterOptions, NewDefaultFilter
 from line.log import LogLine
+from input.common import find_logfiles, group_logfiles, json_loads
+from input.compress import open_log
+from input.index import FileIndex, TraceIndex
 from input.log import SingleReader
+from line.timestamp import epoch_ns
 
 
 def find_executable(name: typing.AnyStr) -> typing.AnyStr:
@@ -17,21 +21,8 @@ def find_executable(name: typing.AnyStr) -> typing.AnyStr:
     return None
 
 
-def find_logfiles(path: typing.AnyStr) -> typing.List[typing.AnyStr]:
-    loglist = []
-
-    for root, dirs, files in os.walk(os.path.abspath(path), topdown=True):
-        for fl in files:
-            if not fl.endswith(".log"):
-                continue
-            filename = os.path.join(root, fl)
-            loglist.append(filename)
-
-    return loglist
-
-
 class TraceIDStats(object):
-    def __init__(self, trace_id: str, line_filter: FilterOptions):
+    def __init__(self, trace_id: str, line_filter: typing.Optional[FilterOptions]):
         self.trace_id = trace_id
         self.filter = line_filter
 
@@ -45,50 +36,117 @@ class TraceIDStats(object):
         self.count += 1
 
         message = line.message
-        if self.last_message_time is None or self.last_message_time < line.timestamp:
-            self.last_message_time = line.timestamp
+        # nanoseconds since epoch, the stats are kept in the trace index
+        if self.last_message_time is None or self.last_message_time < line.timestamp_key:
+            self.last_message_time = line.timestamp_key
             self.last_message = message
 
         if self.call_site is None and message.find("Incoming request") > -1:
             self.call_site = line.fields.get("callSite", None)
 
+    def merge(self, other: 'TraceIDStats'):
+        self.count += other.count
+
+        if self.last_message_time is None or self.last_message_time < other.last_message_time:
+            self.last_message_time = other.last_message_time
+            self.last_message = other.last_message
+
+        if self.call_site is None:
+            self.call_site = other.call_site
+
+    # the number of values in state()
+    state_size = 4
+
+    def state(self) -> tuple:
+        return self.count, self.last_message_time, self.last_message, self.call_site
+
+    @staticmethod
+    def from_state(trace_id: str, state: tuple) -> 'TraceIDStats':
+        stats = TraceIDStats(trace_id, None)
+        stats.count, stats.last_message_time, stats.last_message, stats.call_site = state
+        return stats
+
     def __repr__(self):
         return "(%s, %s, '%s')" % (self.trace_id, self.count, self.last_message)
 
 
+def index_log_file(log_file: str) -> FileIndex:
+    line_filter = NewDefaultFilter()
+    reader = SingleReader(None, line_filter)
+
+    file_index = FileIndex.new(log_file)
+    summary = {}
+
+    # offsets of compressed files are offsets in decompressed data
+    with open_log(log_file) as inp:
+        offset = 0
+        for raw_line in inp:
+            line = reader.parse_line(raw_line)
+            if isinstance(line, LogLine) and line.traceid is not None:
+                trace_id = line.traceid
+                if trace_id not in summary:
+                    summary[trace_id] = TraceIDStats(trace_id, None)
+                summary[trace_id].add_message(line)
+                file_index.add(trace_id, offset)
+            offset += len(raw_line)
+
+    # summary is a trace_id -> TraceIDStats state of this file
+    file_index.summary = {trace_id: stats.state() for trace_id, stats in summary.items()}
+    return file_index
+
+
 class TraceIDList(object):
     trace_ids: typing.Mapping[str, TraceIDStats]
     trace_ids_banned: typing.Mapping[str, bool]
+    index: TraceIndex
 
-    def __init__(self):
+    def __init__(self, index: TraceIndex, jobs: int = 1):
+        self.jobs = jobs
+        self.index = index
         self.line_filter = NewDefaultFilter()
         self.trace_ids = {}
         self.trace_ids_banned = {}
 
     def read_log_files(self, log_files):
-        for logfile in sorted(log_files):
-            self.read_log_file(logfile)
+        # rotated segments of a log go oldest first
+        log_files = [log_file for group in group_logfiles(sorted(log_files)) for log_file in group]
 
-    def read_log_file(self, log_file: str):
-        print("> Processing file '%s'" % log_file)
-        r = SingleReader(open(log_file, 'r'), self.line_filter)
-        for line in r.read_generator():
-            self.line_append(line)
+        to_index = []
+        for log_file in log_files:
+            if self.index.get(log_file) is None:
+                to_index.append(log_file)
+            else:
+                print("> Using index of file '%s'" % log_file)
 
-    def line_append(self, line: LogLine):
-        if self.line_filter.filter_log_line(line):
-            return
+        if self.jobs > 1 and len(to_index) > 1:
+            with multiprocessing.Pool(min(self.jobs, len(to_index))) as pool:
+                for file_index in pool.imap_unordered(index_log_file, to_index):
+                    print("> Processed file '%s'" % file_index.path)
+                    self.index.put(file_index)
+        else:
+            for log_file in to_index:
+                self.read_log_file(log_file)
 
-        trace_id = line.traceid
-        if trace_id is None or trace_id in self.trace_ids_banned:
-            return
+        self.index.cleanup(log_files)
+        self.index.save()
 
-        if trace_id not in self.trace_ids:
-            self.trace_ids[trace_id] = TraceIDStats(trace_id, self.line_filter)
+        # files are merged in the same order they used to be read
+        for log_file in log_files:
+            self.add_file_index(self.index.get(log_file))
 
-        self.trace_ids[trace_id].add_message(line)
+    def read_log_file(self, log_file: str):
+        print("> Processing file '%s'" % log_file)
+        self.index.put(index_log_file(log_file))
+
+    def add_file_index(self, file_index: FileIndex):
+        for trace_id, state in file_index.summary.items():
+            if trace_id in self.trace_ids_banned:
+                continue
+
+            if trace_id not in self.trace_ids:
+                self.trace_ids[trace_id] = TraceIDStats(trace_id, self.line_filter)
 
-        pass
+            self.trace_ids[trace_id].merge(TraceIDStats.from_state(trace_id, state))
 
     def cleanup(self):
         to_delete_list = []
@@ -119,41 +177,100 @@ def print_debug(trace_id_list: TraceIDList):
         print(repr(stat))
 
 
-def collect_logs(trace_id_list: TraceIDList, input_dir: str):
+class OutputPool(object):
+    # LRU of open output files, the least recently written file is closed once
+    # there are too many of them and reopened for append when needed again
+    files: typing.MutableMapping[str, typing.TextIO]
+    created: typing.Set[str]
+
+    def __init__(self, max_open: int = 256, buffer_size: int = 64 * 1024):
+        self.max_open = max_open
+        self.buffer_size = buffer_size
+        self.files = collections.OrderedDict()
+        self.created = set()
+
+    def get(self, path: str) -> typing.TextIO:
+        out = self.files.get(path, None)
+        if out is not None:
+            self.files.move_to_end(path)
+            return out
+
+        if len(self.files) >= self.max_open:
+            _, oldest = self.files.popitem(last=False)
+            oldest.close()
+
+        mode = 'a' if path in self.created else 'w'
+        self.created.add(path)
+        out = self.files[path] = open(path, mode, buffering=self.buffer_size)
+        return out
+
+    def write(self, path: str, data: str):
+        self.get(path).write(data)
+
+    def close(self):
+        while len(self.files) > 0:
+            self.files.popitem()[1].close()
+
+
+def sort_trace_file(path: str):
+    # file consists of time ordered runs (one per log file), sort is stable and
+    # cheap on such input
+    with open(path, 'r') as inp:
+        lines = inp.readlines()
+    lines.sort(key=lambda json_line: epoch_ns(json_loads(json_line)['time']))
+    with open(path, 'w') as out:
+        out.writelines(lines)
+
+
+def collect_logs(trace_id_list: TraceIDList):
     out_request_tpl = "/tmp/1/%s-%s.%s.trace"
     out_object_tpl = "/tmp/1/%s.trace"
-    cmd_tpl = """ag --nofilename %s %s | jq -s -c 'sort_by(.time) | .[]'"""
     cmd_to_read_tpl = """cat '%s' | python3 /data/python/traceidextractor/logparse.py --force-color | less -SRq"""
 
+    out_names = {}
     for trace_id, stat in trace_id_list.trace_ids.items():
         if stat.call_site is not None:
-            out_name = out_request_tpl % (stat.call_site, stat.count, trace_id)
+            out_names[trace_id] = out_request_tpl % (stat.call_site, stat.count, trace_id)
         else:
-            out_name = out_object_tpl % trace_id
-
-        cmd = cmd_tpl % (trace_id, input_dir)
-
-        with open(out_name, "w") as out:
-            p = subprocess.Popen(cmd, stdout=out, stderr=subprocess.PIPE, shell=True)
-            _, stderr = p.communicate(None)
-            if p.returncode != 0:
-                print("Failed to execute '%s': %s" % (cmd, stderr))
-                return
-            else:
-                cmd_to_read = cmd_to_read_tpl % out_name
-                print("To read use '%s'" % cmd_to_read)
+            out_names[trace_id] = out_object_tpl % trace_id
+
+    # single pass over every log file, lines are routed to files of their traces
+    index = trace_id_list.index
+    sources = collections.Counter()
+    pool = OutputPool()
+    try:
+        for path in sorted(index.files.keys()):
+            written = set()
+            for trace_id, json_line in index.read_traces(path, out_names):
+                pool.write(out_names[trace_id], json_line + "\n")
+                written.add(trace_id)
+            sources.update(written)
+    finally:
+        pool.close()
+
+    for trace_id, out_name in out_names.items():
+        if trace_id not in sources:
+            open(out_name, "w").close()
+        elif sources[trace_id] > 1:
+            sort_trace_file(out_name)
+
+        cmd_to_read = cmd_to_read_tpl % out_name
+        print("To read use '%s'" % cmd_to_read)
 
 
 def main():
     input_dir = "/data/go/src/github.com/insolar/insolar/.artifacts/launchnet/logs/discoverynodes/"
     logs = find_logfiles(input_dir)
 
-    trace_id_list = TraceIDList()
+    index = TraceIndex(input_dir, TraceIDStats.state_size)
+    index.load()
+
+    trace_id_list = TraceIDList(index, jobs=os.cpu_count() or 1)
     trace_id_list.read_log_files(logs)
     trace_id_list.cleanup()
 
     print_debug(trace_id_list)
-    collect_logs(trace_id_list, input_dir)
+    collect_logs(trace_id_list)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import marshal
+import struct
+import sys
+import typing
+
+from input.compress import compression, magic_size
+from input.log import SingleReader
+from input.source import LineSource
+from lib.filter import FilterOptions
+from line.log import LogLine, RawLine
+
+cache_suffix = '.lpcache'
+
+# magic, size and mtime of the log, offset of the first line that isn't cached, end of cached data, digest
+_header = struct.Struct('<8sqqqq20s')
+_magic = b'LPCACHE2'
+_digest_size = 4096
+# items of LogLine state
+_state_size = 12
+
+
+def log_digest(inp: typing.BinaryIO, offset: int) -> bytes:
+    # the first and the last bytes of the cached part of the log, they are checked before
+    # the cache of a grown log is used
+    digest = hashlib.sha1()
+    digest.update(os.pread(inp.fileno(), min(offset, _digest_size), 0))
+    start = max(0, offset - _digest_size)
+    digest.update(os.pread(inp.fileno(), offset - start, start))
+    return digest.digest()
+
+
+class LineCache(object):
+    # sidecar file <log>.lpcache with lines of the log that are decoded already (before any
+    # filtering), fields included; they are marshalled in batches of plain values after the
+    # header, so loading the file can't run any code. Cache of a log that has grown
+    # is used as it is and the new lines are appended to it; cache of a compressed log is
+    # used only while its size and mtime are the same.
+    path: str
+    cache_path: str
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.cache_path = path + cache_suffix
+        self.batch_size = batch_size
+
+    def _cached_part(self, cache: typing.BinaryIO, inp: typing.BinaryIO, compressed: bool) -> \
+            typing.Optional[typing.Tuple[int, int]]:
+        # offset in the log and end of data in the cache, None if the cache can't be used
+        header = cache.read(_header.size)
+        if len(header) != _header.size:
+            return None
+        magic, size, mtime, offset, data_end, digest = _header.unpack(header)
+        if magic != _magic:
+            return None
+
+        stat = os.fstat(inp.fileno())
+        if stat.st_size == size and stat.st_mtime_ns == mtime:
+            return offset, data_end
+        if compressed or stat.st_size < offset or log_digest(inp, offset) != digest:
+            return None
+        return offset, data_end
+
+    @staticmethod
+    def _dump(batch: typing.List[typing.Union[LogLine, RawLine]], cache: typing.BinaryIO):
+        # log lines as their state (see LogLine.__getstate__), raw lines as strings
+        marshal.dump([line.__getstate__() for line in batch], cache)
+
+    def _load(self, cache: typing.BinaryIO, data_end: int) -> \
+            typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        while cache.tell() < data_end:
+            try:
+                batch = marshal.load(cache)
+            except (EOFError, ValueError, TypeError) as e:
+                raise ValueError("broken cache '%s': %s" % (self.cache_path, str(e)))
+            if type(batch) is not list:
+                raise ValueError("broken cache '%s'" % self.cache_path)
+            for state in batch:
+                if type(state) is str:
+                    yield RawLine(state)
+                elif type(state) is tuple and len(state) == _state_size:
+                    line = LogLine.__new__(LogLine)
+                    line.__setstate__(state)
+                    yield line
+                else:
+                    raise ValueError("broken cache '%s'" % self.cache_path)
+
+    def _decode(self, reader: SingleReader, source: typing.Iterable[bytes]) -> \
+            typing.Generator[typing.Tuple[typing.Union[LogLine, RawLine], bytes], None, None]:
+        for raw_line in source:
+            line = reader.decode_line(raw_line, prefilter=False)
+            if isinstance(line, LogLine):
+                # it's the whole point to decode fields once
+                line.fields
+            yield line, raw_line
+
+    def lines(self, reader: SingleReader) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        # cached lines and then lines of the rest of the log; lines are decoded by the reader
+        # and not filtered by it
+        with open(self.path, 'rb') as inp:
+            compressed = compression(inp.peek(magic_size)[:magic_size]) is not None
+
+            try:
+                cache = open(self.cache_path, 'r+b')
+            except FileNotFoundError:
+                cache = None
+            except OSError as e:
+                if reader.debug:
+                    print("can't use cache '%s': %s" % (self.cache_path, str(e)), file=sys.stderr)
+                yield from self._decode_uncached(reader, inp)
+                return None
+
+            cached = None
+            if cache is not None:
+                cached = self._cached_part(cache, inp, compressed)
+            if cached is None:
+                try:
+                    if cache is not None:
+                        cache.close()
+                    cache = open(self.cache_path, 'w+b')
+                except OSError as e:
+                    if reader.debug:
+                        print("can't write cache '%s': %s" % (self.cache_path, str(e)), file=sys.stderr)
+                    yield from self._decode_uncached(reader, inp)
+                    return None
+                # there is no valid header until the cache is complete
+                cache.write(b'\0' * _header.size)
+                cached = (0, _header.size)
+
+            with cache:
+                offset, data_end = cached
+                yield from self._load(cache, data_end)
+                if compressed and offset > 0:
+                    return None
+
+                cache.truncate(data_end)
+                cache.seek(data_end)
+                inp.seek(offset)
+                yield from self._append(reader, cache, inp, offset, compressed)
+
+    def _decode_uncached(self, reader: SingleReader, inp: typing.BinaryIO) -> \
+            typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        for line, _ in self._decode(reader, LineSource(inp)):
+            yield line
+
+    def _append(self, reader: SingleReader, cache: typing.BinaryIO, inp: typing.BinaryIO, offset: int,
+                compressed: bool) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        batch = []
+        for line, raw_line in self._decode(reader, LineSource(inp)):
+            yield line
+            if not compressed and not raw_line.endswith(b'\n'):
+                # unfinished last line of a growing log, it's parsed again next time
+                continue
+            offset += len(raw_line)
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                self._dump(batch, cache)
+                batch = []
+
+        if len(batch) > 0:
+            self._dump(batch, cache)
+
+        stat = os.fstat(inp.fileno())
+        digest = b'\0' * 20 if compressed else log_digest(inp, offset)
+        data_end = cache.tell()
+        cache.seek(0)
+        cache.write(_header.pack(_magic, stat.st_size, stat.st_mtime_ns, offset, data_end, digest))
+
+
+class CachedReader(object):
+    # reader of a log (segments of it, see group_logfiles) through caches of its files,
+    # lines are filtered the same way SingleReader does
+    paths: typing.Sequence[str]
+
+    def __init__(self, paths: typing.Sequence[str], filter_options: FilterOptions, **kwargs):
+        self.paths = paths
+        self.reader = SingleReader(None, filter_options, **kwargs)
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        accept = self.reader.accept
+        for path in self.paths:
+            for line in LineCache(path).lines(self.reader):
+                if accept(line):
+                    yield line
@@ -1,6 +1,14 @@
+import json
+import os
+import re
 import typing
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 JSONObjectKeyValueList = typing.NewType("JSONObjectKeyValueList", typing.Collection[typing.Dict[str, typing.Any]])
 JSONObject = typing.NewType("JSONObject", typing.Dict[str, typing.Collection[str]])
 
@@ -41,3 +49,124 @@ def json_object_multiple_unique(inp: JSONObjectKeyValueList) -> JSONObject:
     return new_out
 
 
+def json_object_unique_fast(inp: JSONObjectKeyValueList) -> JSONObject:
+    out = dict(inp)
+    if len(out) != len(inp):
+        return json_object_multiple_unique(inp)
+    return out
+
+
+def _json_loads_std(inp: typing.AnyStr) -> typing.Any:
+    return json.loads(inp, object_pairs_hook=json_object_unique_fast)
+
+
+def _json_loads_orjson(inp: typing.AnyStr) -> typing.Any:
+    try:
+        out = orjson.loads(inp)
+    except orjson.JSONDecodeError:
+        return _json_loads_std(inp)
+
+    # every key in compact json ends with '":', strings may only add more of them,
+    # so equal counts mean no duplicate keys and no nested objects in the line.
+    # whitespace before ':' breaks the counting, leave such lines to json module.
+    if isinstance(inp, bytes):
+        key_sep, separators = b'":', (b' :', b'\t:', b'\r:')
+    else:
+        key_sep, separators = '":', (' :', '\t:', '\r:')
+    if type(out) is not dict or inp.count(key_sep) != len(out):
+        return _json_loads_std(inp)
+    for separator in separators:
+        if separator in inp:
+            return _json_loads_std(inp)
+    # orjson turns integers that don't fit into 64 bits into floats
+    if float in map(type, out.values()):
+        return _json_loads_std(inp)
+    return out
+
+
+# json.loads with json_object_multiple_unique semantics for duplicate keys,
+# without paying for the multi-value merge when there are no duplicates
+json_loads: typing.Callable[[typing.AnyStr], typing.Any] = _json_loads_std if orjson is None else _json_loads_orjson
+
+
+def _json_loads_plain_orjson(inp: typing.AnyStr) -> typing.Any:
+    try:
+        return orjson.loads(inp)
+    except orjson.JSONDecodeError:
+        # e.g. broken utf-8, json module is more forgiving about it
+        if isinstance(inp, bytes):
+            inp = inp.decode('utf-8', errors='replace')
+        return json.loads(inp)
+
+
+# json.loads for input that has no duplicate keys by its schema (e.g. go test -json), last one wins
+json_loads_plain: typing.Callable[[typing.AnyStr], typing.Any] = json.loads if orjson is None else \
+    _json_loads_plain_orjson
+
+
+def _json_dumps_std(obj: typing.Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _json_dumps_orjson(obj: typing.Any) -> str:
+    try:
+        return orjson.dumps(obj).decode()
+    except TypeError:
+        # integers that don't fit into 64 bits
+        return _json_dumps_std(obj)
+
+
+# compact single-line json
+json_dumps: typing.Callable[[typing.Any], str] = _json_dumps_std if orjson is None else _json_dumps_orjson
+
+
+_compressed_suffixes = ('.gz', '.xz', '.bz2')
+# <name>.log[.<rotation>][.gz|.xz|.bz2], rotated segments are numbered as logrotate does it:
+# the bigger the number, the older the segment, the current one has no number
+_logfile_re = re.compile(r'(.*\.log)(?:\.(\d+))?$')
+
+
+def split_logfile(path: typing.AnyStr) -> typing.Optional[typing.Tuple[typing.AnyStr, int]]:
+    for suffix in _compressed_suffixes:
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+            break
+
+    match = _logfile_re.match(path)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2) or 0)
+
+
+def find_logfiles(path: typing.AnyStr) -> typing.List[typing.AnyStr]:
+    loglist = []
+
+    for root, dirs, files in os.walk(os.path.abspath(path), topdown=True):
+        for fl in files:
+            if split_logfile(fl) is None:
+                continue
+            filename = os.path.join(root, fl)
+            loglist.append(filename)
+
+    return loglist
+
+
+def group_logfiles(paths: typing.Iterable[typing.AnyStr]) -> typing.List[typing.List[typing.AnyStr]]:
+    # rotated segments of the same log, oldest first; groups keep order of their first file
+    groups = {}
+    for path in paths:
+        split = split_logfile(path)
+        base, rotation = split if split is not None else (path, 0)
+        groups.setdefault(base, []).append((-rotation, path))
+
+    return [[path for _, path in sorted(group)] for group in groups.values()]
+
+
+def expand_inputs(paths: typing.Iterable[typing.AnyStr]) -> typing.List[typing.List[typing.AnyStr]]:
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            inputs.extend(sorted(find_logfiles(path)))
+        else:
+            inputs.append(path)
+    return group_logfiles(inputs)
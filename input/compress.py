@@ -0,0 +1,150 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+import typing
+
+_magics = [
+    (b'\x1f\x8b', 'gz'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bz2'),
+]
+magic_size = 6
+
+
+def compression(head: bytes) -> typing.Optional[str]:
+    for magic, kind in _magics:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def decompressor(kind: str, inp: typing.BinaryIO) -> typing.BinaryIO:
+    if kind == 'gz':
+        return gzip.GzipFile(fileobj=inp, mode='rb')
+    if kind == 'xz':
+        return lzma.LZMAFile(inp, mode='rb')
+    if kind == 'bz2':
+        return bz2.BZ2File(inp, mode='rb')
+    raise ValueError("unknown compression '%s'" % kind)
+
+
+class ThreadedReader(io.RawIOBase):
+    # reads (and so decompresses) the stream ahead in a background thread, zlib, lzma
+    # and bz2 release GIL while working, so parser doesn't wait for them
+    input: typing.BinaryIO
+    block_size: int
+
+    def __init__(self, inp: typing.BinaryIO, block_size: int = 1024 * 1024, depth: int = 8):
+        super(ThreadedReader, self).__init__()
+        self.input = inp
+        self.block_size = block_size
+        self.blocks = queue.Queue(depth)
+        self.thread = None
+        self.stopped = False
+        self.pending = memoryview(b'')
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _run(self):
+        try:
+            while not self.stopped:
+                block = self.input.read(self.block_size)
+                self.blocks.put(block)
+                if not block:
+                    return
+        except BaseException as e:
+            self.blocks.put(e)
+
+    def readinto(self, buffer) -> int:
+        if len(self.pending) == 0:
+            if self.eof:
+                return 0
+            # thread is started lazily, after worker processes are forked
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+            block = self.blocks.get()
+            if isinstance(block, BaseException):
+                self.eof = True
+                raise block
+            if not block:
+                self.eof = True
+                return 0
+            self.pending = memoryview(block)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        self.stopped = True
+        if self.thread is not None:
+            while self.thread.is_alive():
+                try:
+                    self.blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        self.input.close()
+        super(ThreadedReader, self).close()
+
+
+class ChainReader(io.RawIOBase):
+    # several files read one after another, e.g. rotated segments of the same log
+    paths: typing.List[str]
+
+    def __init__(self, paths: typing.Sequence[str], threaded: bool = True):
+        super(ChainReader, self).__init__()
+        self.paths = list(paths)
+        self.threaded = threaded
+        self.current = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self.current is None:
+                if len(self.paths) == 0:
+                    return 0
+                self.current = open_log(self.paths.pop(0), self.threaded)
+
+            size = self.current.readinto(buffer)
+            if size:
+                return size
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        super(ChainReader, self).close()
+
+
+def open_log(path: str, threaded: bool = False) -> typing.BinaryIO:
+    # binary stream of (decompressed) log file; compression is detected by content,
+    # not by name. Threaded stream isn't seekable.
+    inp = open(path, 'rb')
+    kind = compression(inp.peek(magic_size)[:magic_size])
+    if kind is None:
+        return inp
+
+    stream = decompressor(kind, inp)
+    if threaded:
+        return io.BufferedReader(ThreadedReader(stream))
+    return stream
+
+
+def open_logs(paths: typing.Sequence[str], threaded: bool = True) -> typing.BinaryIO:
+    if len(paths) == 1:
+        return open_log(paths[0], threaded)
+    return io.BufferedReader(ChainReader(paths, threaded))
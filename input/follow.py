@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import os
+import sys
+import time
+import typing
+
+from input.common import find_logfiles, split_logfile
+from input.group import LineGroup, group_key
+from input.log import SingleReader
+from lib.filter import FilterOptions
+from line.log import LogLine, RawLine
+
+
+def _is_live_logfile(path: str) -> bool:
+    # rotated and compressed segments are finished already, only current logs grow
+    split = split_logfile(path)
+    return split is not None and split[1] == 0 and split[0] == path
+
+
+class TailedFile(object):
+    # file that is read as it grows, it's reopened once the path points to another
+    # file (rotation) and reread from the start once it's truncated
+    path: str
+    input: typing.Optional[typing.BinaryIO]
+    identity: typing.Optional[typing.Tuple[int, int]]
+
+    def __init__(self, path: str, reader: SingleReader, read_size: int = 4 * 1024 * 1024):
+        self.path = path
+        self.reader = reader
+        self.read_size = read_size
+        self.input = None
+        self.identity = None
+        self.tail = b''
+        self.group: LineGroup = []
+        self.has_log_line = False
+
+    def _open(self) -> bool:
+        try:
+            inp = open(self.path, 'rb')
+        except OSError:
+            return False
+        stat = os.fstat(inp.fileno())
+        self.input = inp
+        self.identity = (stat.st_dev, stat.st_ino)
+        self.tail = b''
+        return True
+
+    def _rotated(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino) != self.identity
+
+    def _read(self) -> typing.List[bytes]:
+        data = self.input.read(self.read_size)
+        if not data:
+            return []
+        lines = (self.tail + data).split(b'\n')
+        self.tail = lines.pop()
+        return [line + b'\n' for line in lines]
+
+    def poll(self) -> typing.List[bytes]:
+        if self.input is None and not self._open():
+            return []
+
+        lines = self._read()
+        if len(lines) > 0:
+            return lines
+
+        if self._rotated():
+            # old file is read till the end already, continue with the new one
+            self.input.close()
+            self.input = None
+            if self.tail:
+                lines.append(self.tail + b'\n')
+            if self._open():
+                lines.extend(self._read())
+        elif os.fstat(self.input.fileno()).st_size < self.input.tell():
+            self.input.seek(0)
+            self.tail = b''
+        return lines
+
+    def groups(self, lines: typing.List[bytes]) -> typing.List[LineGroup]:
+        # same grouping as MergeReader does: raw lines follow their log line; the last group
+        # is kept open until the next log line or until the file stops growing
+        rv = []
+        for raw_line in lines:
+            line = self.reader.parse_line(raw_line)
+            if line is None:
+                continue
+            if isinstance(line, LogLine):
+                if self.has_log_line:
+                    rv.append(self.group)
+                    self.group = []
+                self.has_log_line = True
+            self.group.append(line)
+
+        if len(lines) == 0 and len(self.group) > 0:
+            rv.append(self.group)
+            self.group = []
+            self.has_log_line = False
+        return rv
+
+    def close(self):
+        if self.input is not None:
+            self.input.close()
+            self.input = None
+
+
+class FollowReader(object):
+    # tail -F over several logs: lines are kept in a heap for a reorder window and released
+    # in timestamp order once the newest seen timestamp is the window ahead of them, or once
+    # nothing was read for the window (wall clock). Memory is bound by the window.
+    paths: typing.Sequence[str]
+    window: int
+    poll_interval: float
+
+    def __init__(self, paths: typing.Sequence[str], filter_options: FilterOptions, **kwargs):
+        self.paths = paths
+        self.filter = filter_options
+        self.window = int(kwargs.pop("window", 0.5) * 1000000000)
+        self.poll_interval = kwargs.pop("poll_interval", 0.2)
+        self.kwargs = kwargs
+
+        self.files: typing.Dict[str, TailedFile] = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.newest = None
+
+    def _scan(self):
+        for path in self.paths:
+            if os.path.isdir(path):
+                found = [log_file for log_file in find_logfiles(path) if _is_live_logfile(log_file)]
+            else:
+                found = [path]
+            for log_file in found:
+                if log_file not in self.files:
+                    if self.kwargs.get("debug", False):
+                        print("following '%s'" % log_file, file=sys.stderr)
+                    reader = SingleReader(None, self.filter, **self.kwargs)
+                    self.files[log_file] = TailedFile(log_file, reader)
+
+    def _push(self, group: LineGroup):
+        key = group_key(group)
+        if len(key) == 1:
+            # raw lines without log line to follow, there is nothing to order them by
+            key = (1, self.newest or 0)
+        elif self.newest is None or key[1] > self.newest:
+            self.newest = key[1]
+        heapq.heappush(self.heap, (key, next(self.counter), group))
+
+    def _release(self, everything: bool) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        watermark = None
+        if not everything:
+            watermark = 0 if self.newest is None else self.newest - self.window
+        while len(self.heap) > 0:
+            if watermark is not None and self.heap[0][0][1] > watermark:
+                return None
+            yield from heapq.heappop(self.heap)[2]
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        last_read = time.monotonic()
+        try:
+            while True:
+                self._scan()
+
+                has_data = False
+                for tailed in self.files.values():
+                    lines = tailed.poll()
+                    has_data = has_data or len(lines) > 0
+                    for group in tailed.groups(lines):
+                        self._push(group)
+
+                now = time.monotonic()
+                if has_data:
+                    last_read = now
+                yield from self._release(now - last_read >= self.window / 1000000000)
+
+                if not has_data:
+                    time.sleep(self.poll_interval)
+        finally:
+            for tailed in self.files.values():
+                tailed.close()
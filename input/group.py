@@ -0,0 +1,29 @@
+import typing
+
+from line.log import LogLine, RawLine
+
+LineGroup = typing.List[typing.Union[LogLine, RawLine]]
+
+
+def group_lines(lines: typing.Iterable[typing.Union[LogLine, RawLine]]) -> typing.Generator[LineGroup, None, None]:
+    # raw lines (backtraces, garbage) have no timestamp, so they travel together
+    # with the log line they follow; leading raw lines stick to the first log line
+    group: LineGroup = []
+    has_log_line = False
+    for line in lines:
+        if isinstance(line, LogLine):
+            if has_log_line:
+                yield group
+                group = []
+            has_log_line = True
+        group.append(line)
+
+    if len(group) > 0:
+        yield group
+
+
+def group_key(group: LineGroup):
+    for line in group:
+        if isinstance(line, LogLine):
+            return 1, line.timestamp_key
+    return 0,
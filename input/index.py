@@ -0,0 +1,144 @@
+import marshal
+import os
+import sys
+import typing
+
+from input.compress import open_log
+from line.extractor import LineExtractor
+from line.store import LineStore
+
+
+class FileIndex(object):
+    path: str
+    size: int
+    mtime: int
+    lines: LineStore
+    summary: typing.Dict[str, tuple]
+
+    def __init__(self, path: str, size: int, mtime: int):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        # byte offsets and traceids of lines
+        self.lines = LineStore()
+        # trace_id -> tuple of str, int, float or None values the user of the index keeps along with offsets
+        self.summary = {}
+
+    def add(self, trace_id: str, offset: int):
+        self.lines.append(trace_id, offset)
+
+    def is_valid(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+
+    def __getstate__(self):
+        return self.path, self.size, self.mtime, self.lines.__getstate__(), self.summary
+
+    def __setstate__(self, state):
+        self.path, self.size, self.mtime, lines, self.summary = state
+        self.lines = LineStore.__new__(LineStore)
+        self.lines.__setstate__(lines)
+
+    @staticmethod
+    def new(path: str) -> 'FileIndex':
+        stat = os.stat(path)
+        return FileIndex(path, stat.st_size, stat.st_mtime_ns)
+
+
+_scalars = (str, int, float, type(None))
+
+
+def _is_file_state(state: typing.Any, summary_size: int) -> bool:
+    # FileIndex state is plain data (see FileIndex.__getstate__), every part of it is checked
+    # before it's used, the index is a file anybody could put next to the logs
+    if type(state) is not tuple or len(state) != 5:
+        return False
+    path, size, mtime, lines, summary = state
+    if type(path) is not str or type(size) is not int or type(mtime) is not int:
+        return False
+    if not LineStore.is_state(lines) or type(summary) is not dict:
+        return False
+    for trace_id, values in summary.items():
+        if type(trace_id) is not str or type(values) is not tuple or len(values) != summary_size or \
+                not all(type(value) in _scalars for value in values):
+            return False
+    return True
+
+
+class TraceIndex(object):
+    # traceid -> (file, offset) index of log files, it's stored next to the logs
+    # and every file is reindexed once its size or mtime changes; it's marshalled
+    # as plain values, so loading it can't run any code
+    version = 3
+    index_name = '.traceid.index'
+
+    path: str
+    files: typing.Dict[str, FileIndex]
+
+    def __init__(self, directory: str, summary_size: int = 0):
+        self.path = os.path.join(directory, self.index_name)
+        # number of values in every summary of a trace
+        self.summary_size = summary_size
+        self.files = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as inp:
+                data = marshal.load(inp)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print("failed to load trace index '%s': %s" % (self.path, str(e)), file=sys.stderr)
+            return
+
+        if type(data) is not tuple or len(data) != 2 or data[0] != self.version:
+            return
+        states = data[1]
+        if type(states) is not list or not all(_is_file_state(state, self.summary_size) for state in states):
+            print("failed to load trace index '%s': broken index" % self.path, file=sys.stderr)
+            return
+
+        for state in states:
+            file_index = FileIndex.__new__(FileIndex)
+            file_index.__setstate__(state)
+            self.files[file_index.path] = file_index
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            marshal.dump((self.version, [file_index.__getstate__() for file_index in self.files.values()]), out)
+        os.replace(tmp_path, self.path)
+
+    def get(self, path: str) -> typing.Optional[FileIndex]:
+        file_index = self.files.get(path, None)
+        if file_index is None or not file_index.is_valid():
+            return None
+        return file_index
+
+    def put(self, file_index: FileIndex):
+        self.files[file_index.path] = file_index
+
+    def cleanup(self, paths: typing.Collection[str]):
+        for path in list(self.files.keys()):
+            if path not in paths:
+                del self.files[path]
+
+    def read_traces(self, path: str, trace_ids: typing.Container[str]) -> \
+            typing.Generator[typing.Tuple[str, str], None, None]:
+        # lines of given traces in file order, lines are stored in it, so offsets are read
+        # ascending and seeks stay mostly inside the read buffer
+        selected = self.files[path].lines.select(trace_ids)
+        if len(selected) == 0:
+            return
+
+        extractor = LineExtractor()
+        with open_log(path) as inp:
+            for offset, trace_id in selected:
+                inp.seek(offset)
+                line = extractor(inp.readline().decode('utf-8', errors='replace'))
+                if line is None:
+                    continue
+                yield trace_id, line.json_line
@@ -1,62 +1,130 @@
-import json
 import sys
 import typing
 
-from input.common import json_object_multiple_unique
+from input.common import json_loads
 from lib.filter import FilterOptions
 from line.log import LogLine, RawLine
 from line.extractor import LineExtractor
+from line.where import Where
+from input.prefilter import Prefilter
+from input.profile import StageProfile
+from input.sort import ExternalSorter
+from input.source import LineSource, default_block_size
 
 
 class SingleReader(object):
-    def __init__(self, inp: typing.Optional[typing.TextIO], filter_options: FilterOptions, **kwargs):
+    def __init__(self, inp: typing.Optional[typing.IO], filter_options: FilterOptions, **kwargs):
         self.input = inp
         if self.input is None:
             self.input = sys.stdin
+        self.source = LineSource(self.input, kwargs.get("block_size", default_block_size), kwargs.get("limit", None))
         self.filter = filter_options
 
         self.extractor = LineExtractor()
 
         self.debug = kwargs.get("debug", False)
+        self.prefilter: typing.Optional[Prefilter] = kwargs.get("prefilter", None) or None
+        self.where: typing.Optional[Where] = kwargs.get("where", None)
+        # time range (epoch ns, until isn't included), raw lines after a log line out of it are dropped too
+        self.since: typing.Optional[int] = kwargs.get("since", None)
+        self.until: typing.Optional[int] = kwargs.get("until", None)
+        # whether the last log line was in the range, None if it isn't known (see ParallelReader)
+        self.in_range: typing.Optional[bool] = self.since is None
 
-    def read_line(self) -> typing.Union[LogLine, RawLine, None]:
-        while True:
-            raw_line = self.input.readline()
-            if raw_line is None or raw_line == "":
-                return None
+        # stages are attributes, so that a profile can replace them with timed ones
+        self.json_loads = json_loads
+        self.new_line = LogLine
+        self.prefilter_check = None if self.prefilter is None else self.prefilter.check
+        self.profile: typing.Optional[StageProfile] = kwargs.get("profile", None)
+        if self.profile is not None:
+            self._instrument(self.profile)
 
-            line = self.extractor(raw_line)
-            if line is None:
-                return RawLine(raw_line)
+        # read_sorted keeps that much of lines in memory, the rest is spilled to tmp_dir
+        self.sort_memory = kwargs.get("sort_memory", 1024 * 1024 * 1024)
+        self.tmp_dir = kwargs.get("tmp_dir", None)
 
-            try:
-                raw_parsed_line = json.loads(line.json_line, object_pairs_hook=json_object_multiple_unique)
-            except Exception as e:
-                if self.debug:
-                    print("failed to parse json [%s]: '%s'" % (str(e), line.json_line), file=sys.stderr)
-                return RawLine(raw_line)
+    def _instrument(self, profile: StageProfile):
+        self.extractor = profile.stage('extract', self.extractor)
+        if self.prefilter_check is not None:
+            self.prefilter_check = profile.stage('prefilter', self.prefilter_check)
+        self.json_loads = profile.stage('json', self.json_loads)
+        self.new_line = profile.stage('logline', self.new_line)
+        self.accept = profile.stage('filter', self.accept)
 
-            log_line: LogLine
-            try:
-                log_line = LogLine(raw_parsed_line)
-            except Exception as e:
-                if self.debug:
-                    print("failed to disassemble log line [%s]: '%s'" % (str(e), line.json_line), file=sys.stderr)
-                return RawLine(raw_line)
+    def _failed(self, reason: str, e: Exception, json_line: str):
+        if self.profile is not None:
+            self.profile.fail('%s: %s' % (reason, type(e).__name__))
+        if self.debug:
+            print("failed to %s [%s]: '%s'" % (reason, str(e), json_line), file=sys.stderr)
 
-            if not self.filter.filter_log_line(log_line):
-                return log_line
+    def decode_line(self, raw_line: bytes, prefilter: bool = True) -> typing.Union[LogLine, RawLine, None]:
+        # text is decoded here rather than by the stream, so that it happens in worker
+        # processes of ParallelReader; broken utf-8 doesn't stop reading either
+        raw_line = raw_line.decode('utf-8', errors='replace')
+        line = self.extractor(raw_line)
+        if line is None:
+            return RawLine(raw_line)
+        if prefilter and self.prefilter_check is not None and not self.prefilter_check(line.json_line):
+            return None
 
-    def read_generator(self) -> typing.Generator[LogLine, None, None]:
+        try:
+            raw_parsed_line = self.json_loads(line.json_line)
+        except Exception as e:
+            self._failed('parse json', e, line.json_line)
+            return RawLine(raw_line)
+
+        log_line: LogLine
+        try:
+            log_line = self.new_line(raw_parsed_line)
+        except Exception as e:
+            self._failed('disassemble log line', e, line.json_line)
+            return RawLine(raw_line)
+        return log_line
+
+    def accept(self, line: typing.Union[LogLine, RawLine]) -> bool:
+        if isinstance(line, RawLine):
+            # backtraces and such belong to the log line before them
+            return self.in_range is not False
+        if self.since is not None or self.until is not None:
+            timestamp = line.timestamp_key
+            self.in_range = (self.since is None or timestamp >= self.since) and \
+                (self.until is None or timestamp < self.until)
+            if not self.in_range:
+                return False
+        if self.prefilter is not None and not self.prefilter.confirm(line):
+            return False
+        if self.where is not None and not self.where(line):
+            return False
+        return not self.filter.filter_log_line(line)
+
+    def parse_line(self, raw_line: bytes) -> typing.Union[LogLine, RawLine, None]:
+        line = self.decode_line(raw_line)
+        if line is None or not self.accept(line):
+            return None
+        return line
+
+    def read_line(self) -> typing.Union[LogLine, RawLine, None]:
         while True:
-            line = self.read_line()
-            if line is None:
+            raw_line = self.source.readline()
+            if raw_line == b"":
                 return None
-            yield line
+
+            line = self.parse_line(raw_line)
+            if line is not None:
+                return line
+
+    def read_generator(self) -> typing.Generator[LogLine, None, None]:
+        parse_line = self.parse_line
+        source = self.source if self.profile is None else self.profile.iterate('read', self.source)
+        for raw_line in source:
+            line = parse_line(raw_line)
+            if line is not None:
+                yield line
 
     def read_all(self) -> typing.Collection[LogLine]:
         return [line for line in self.read_generator()]
 
-    def read_sorted(self) -> typing.Collection[LogLine]:
-        lines = self.read_all()
-        return sorted(lines, key=lambda x: x.timestamp)
+    def read_sorted(self) -> typing.Iterable[typing.Union[LogLine, RawLine]]:
+        # raw lines stay with the log line they follow
+        sorter = ExternalSorter(self.sort_memory, self.tmp_dir)
+        return sorter.sort(self.read_generator())
@@ -0,0 +1,50 @@
+import heapq
+import typing
+
+from lib.filter import FilterOptions
+from line.log import LogLine, RawLine
+from input.group import group_key, group_lines
+from input.log import SingleReader
+from input.parallel import InFlight, new_pool, new_reader
+
+
+def _is_reader(inp: typing.Any) -> bool:
+    # inputs that are read some special way come with their own readers (e.g. CachedReader)
+    return hasattr(inp, 'read_generator')
+
+
+class MergeReader(object):
+    # streams or readers
+    inputs: typing.Sequence[typing.Any]
+    jobs: int
+
+    def __init__(self, inputs: typing.Sequence[typing.Any], filter_options: FilterOptions, **kwargs):
+        self.inputs = inputs
+        self.filter = filter_options
+        self.jobs = kwargs.pop("jobs", 1)
+        self.kwargs = kwargs
+
+    def _merge(self, readers: typing.Sequence[typing.Any]) -> \
+            typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        # every input is expected to be sorted already (one log per node), so
+        # a lazy k-way merge gives the same order as a full (stable) sort
+        streams = [group_lines(reader.read_generator()) for reader in readers]
+        for group in heapq.merge(*streams, key=group_key):
+            yield from group
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        if self.jobs <= 1:
+            readers = [inp if _is_reader(inp) else SingleReader(inp, self.filter, **self.kwargs)
+                       for inp in self.inputs]
+            yield from self._merge(readers)
+            return None
+
+        # one pool shared by all the inputs, otherwise we'll end up with jobs * inputs processes,
+        # and one limit of chunks in flight, otherwise memory grows with the number of inputs
+        with new_pool(self.jobs, self.filter, **self.kwargs) as pool:
+            in_flight = InFlight(self.jobs * 2)
+            # readers of inputs do their own thing, e.g. cached logs are decoded already
+            readers = [inp if _is_reader(inp) else
+                       new_reader(inp, self.filter, self.jobs, pool=pool, in_flight=in_flight, **self.kwargs)
+                       for inp in self.inputs]
+            yield from self._merge(readers)
@@ -0,0 +1,149 @@
+import collections
+import multiprocessing
+import multiprocessing.pool
+import typing
+
+from lib.filter import FilterOptions
+from line.log import LogLine, RawLine
+from input.log import SingleReader
+from input.profile import StageProfile
+
+_worker_reader: typing.Optional[SingleReader] = None
+
+
+def _worker_init(filter_options: FilterOptions, kwargs: typing.Dict[str, typing.Any]):
+    global _worker_reader
+    _worker_reader = SingleReader(None, filter_options, **kwargs)
+
+
+def _worker_parse(chunk: typing.List[bytes]) -> \
+        typing.Tuple[typing.List[typing.Union[LogLine, RawLine]], int, typing.Optional[bool]]:
+    # lines of the chunk, the number of raw lines at its start that are kept because the log line
+    # before them is in another chunk, and whether the last log line of the chunk is in the time range
+    reader = _worker_reader
+    reader.in_range = None
+    rv = []
+    leading = 0
+    for raw_line in chunk:
+        line = reader.parse_line(raw_line)
+        if line is not None:
+            rv.append(line)
+            if reader.in_range is None:
+                leading += 1
+    return rv, leading, reader.in_range
+
+
+def _worker_parse_profiled(chunk: typing.List[bytes]) -> typing.Tuple[typing.Any, typing.Any]:
+    # counters of the worker go back with every chunk
+    return _worker_parse(chunk), _worker_reader.profile.take()
+
+
+def new_pool(jobs: int, filter_options: FilterOptions, **kwargs) -> multiprocessing.pool.Pool:
+    reader_kwargs = {
+        "debug": kwargs.get("debug", False),
+        "prefilter": kwargs.get("prefilter", None),
+        "where": kwargs.get("where", None),
+        "since": kwargs.get("since", None),
+        "until": kwargs.get("until", None),
+    }
+    if kwargs.get("profile", None) is not None:
+        # every worker has its own
+        reader_kwargs["profile"] = StageProfile()
+    return multiprocessing.Pool(jobs, initializer=_worker_init, initargs=(filter_options, reader_kwargs))
+
+
+class InFlight(object):
+    # chunks submitted to a pool and not taken back yet, readers that share the pool share
+    # it too, so that memory doesn't grow with the number of inputs
+    limit: int
+    count: int
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.count = 0
+
+
+class ParallelReader(SingleReader):
+    jobs: int
+    chunk_size: int
+    pool: typing.Optional[multiprocessing.pool.Pool]
+    in_flight: InFlight
+
+    def __init__(self, inp: typing.Optional[typing.IO], filter_options: FilterOptions, jobs: int, **kwargs):
+        super(ParallelReader, self).__init__(inp, filter_options, **kwargs)
+
+        self.jobs = jobs
+        self.chunk_size = kwargs.get("chunk_size", 4 * 1024 * 1024)
+        # pool may be shared between several readers (see MergeReader), in_flight goes with it
+        self.pool = kwargs.get("pool", None)
+        self.in_flight = kwargs.get("in_flight", None) or InFlight(jobs * 2)
+
+        self.lines = None
+
+    def read_chunks(self) -> typing.Generator[typing.List[bytes], None, None]:
+        return self.source.read_chunks(self.chunk_size)
+
+    def _chunk_lines(self, parsed: typing.Tuple[typing.List[typing.Union[LogLine, RawLine]], int,
+                                                typing.Optional[bool]]) -> typing.List[typing.Union[LogLine, RawLine]]:
+        # chunks come in order, so the previous one tells where raw lines at the start of this one go
+        lines, leading, in_range = parsed
+        if leading > 0 and self.in_range is False:
+            lines = lines[leading:]
+        if in_range is not None:
+            self.in_range = in_range
+        return lines
+
+    def _results(self, pool: multiprocessing.pool.Pool, worker: typing.Callable,
+                 chunks: typing.Iterable[typing.List[bytes]]) -> typing.Generator[typing.Any, None, None]:
+        # results of worker for chunks in submission order; a reader that has chunks in flight
+        # waits for them once the limit is reached, one that has none may always submit one,
+        # otherwise readers of a merge would wait for each other
+        in_flight = self.in_flight
+        pending = collections.deque()
+        try:
+            for chunk in chunks:
+                while len(pending) > 0 and in_flight.count >= in_flight.limit:
+                    in_flight.count -= 1
+                    yield pending.popleft().get()
+                pending.append(pool.apply_async(worker, (chunk,)))
+                in_flight.count += 1
+
+            while len(pending) > 0:
+                in_flight.count -= 1
+                yield pending.popleft().get()
+        finally:
+            # the reader may be dropped before it's read through
+            in_flight.count -= len(pending)
+
+    def _read_parallel(self, pool: multiprocessing.pool.Pool) -> \
+            typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        chunks = self.read_chunks()
+        if self.profile is not None:
+            for parsed, taken in self._results(pool, _worker_parse_profiled,
+                                               self.profile.iterate('read', chunks, len)):
+                self.profile.add(taken)
+                yield from self._chunk_lines(parsed)
+            return None
+
+        for parsed in self._results(pool, _worker_parse, chunks):
+            yield from self._chunk_lines(parsed)
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        if self.pool is not None:
+            yield from self._read_parallel(self.pool)
+            return None
+
+        with new_pool(self.jobs, self.filter, debug=self.debug, prefilter=self.prefilter, where=self.where,
+                      since=self.since, until=self.until, profile=self.profile) as pool:
+            yield from self._read_parallel(pool)
+
+    def read_line(self) -> typing.Union[LogLine, RawLine, None]:
+        if self.lines is None:
+            self.lines = self.read_generator()
+        return next(self.lines, None)
+
+
+def new_reader(inp: typing.Optional[typing.IO], filter_options: FilterOptions, jobs: int = 1, **kwargs) -> SingleReader:
+    if jobs <= 1:
+        return SingleReader(inp, filter_options, **kwargs)
+    return ParallelReader(inp, filter_options, jobs, **kwargs)
@@ -0,0 +1,95 @@
+import json
+import typing
+
+from line.log import LogLine
+
+# attributes LogLine takes out of the parsed line
+_line_attributes = {
+    'nodeid': lambda line: line.node,
+    'role': lambda line: line.role,
+    'level': lambda line: line.level,
+    'caller': lambda line: line.caller,
+    'traceid': lambda line: line.traceid,
+    'message': lambda line: line.message,
+}
+
+
+def raw_needle(value: str) -> typing.Optional[str]:
+    # json encoders escape quotes, backslashes, control and non-ascii characters,
+    # go also escapes <, > and &, such strings can't be looked for in raw text
+    if json.dumps(value)[1:-1] != value or '<' in value or '>' in value or '&' in value:
+        return None
+    return value
+
+
+class Prefilter(object):
+    # every group is a tuple of substrings, json of a line has to contain at least
+    # one substring of every group to be decoded; it's a necessary condition only,
+    # lines that survived are checked again after decoding (see confirm)
+    groups: typing.List[typing.Tuple[str, ...]]
+    fields: typing.List[typing.Tuple[str, typing.Collection[str]]]
+
+    def __init__(self):
+        self.groups = []
+        self.fields = []
+
+    def __bool__(self) -> bool:
+        return len(self.groups) > 0 or len(self.fields) > 0
+
+    def require_any(self, values: typing.Iterable[str], quoted: typing.Union[bool, typing.Sequence[bool]] = False) -> \
+            bool:
+        # quoted is either for all the values or one for every value
+        values = list(values)
+        if isinstance(quoted, bool):
+            quoted = [quoted] * len(values)
+        needles = []
+        for value, quote in zip(values, quoted):
+            needle = raw_needle(value)
+            if needle is None or needle == '':
+                return False
+            needles.append('"%s"' % needle if quote else needle)
+        if len(needles) == 0:
+            return False
+
+        self.groups.append(tuple(needles))
+        return True
+
+    def require_field(self, key: str, values: typing.Collection[str]):
+        # it's up to the reader to check fields after decoding, so they are kept even if
+        # values can't be looked for in raw text
+        self.fields.append((key, frozenset(values)))
+        self.require_any(values, quoted=True)
+
+    def check(self, json_line: str) -> bool:
+        for group in self.groups:
+            for needle in group:
+                if needle in json_line:
+                    break
+            else:
+                return False
+        return True
+
+    def confirm(self, line: LogLine) -> bool:
+        for key, values in self.fields:
+            getter = _line_attributes.get(key, None)
+            if getter is not None:
+                value = getter(line)
+            else:
+                value = line.fields.get(key, None)
+            if isinstance(value, list):
+                # duplicated key with different values
+                if values.isdisjoint(value):
+                    return False
+            elif value not in values:
+                return False
+        return True
+
+    @staticmethod
+    def from_args(args) -> 'Prefilter':
+        rv = Prefilter()
+        # message filter itself is checked by FilterOptions
+        if len(getattr(args, 'filter_message', [])) > 0:
+            rv.require_any(args.filter_message)
+        if len(getattr(args, 'filter_traceid', [])) > 0:
+            rv.require_field('traceid', args.filter_traceid)
+        return rv
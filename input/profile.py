@@ -0,0 +1,128 @@
+import collections
+import sys
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# stages in the order lines go through them, others are reported after these
+_order = ['read', 'extract', 'prefilter', 'json', 'logline', 'filter', 'print', 'analyze']
+
+
+class StageProfile(object):
+    # time spent in stages of the reader pipeline, lines in and out of every stage and reasons
+    # lines weren't parsed. Readers get it as profile= keyword (see --profile-stages) and wrap
+    # their stages with it, readers without one aren't touched at all.
+    stages: typing.Dict[str, typing.List[int]]
+    failures: typing.Counter[str]
+
+    def __init__(self):
+        self.started = time.perf_counter_ns()
+        # name -> [lines in, lines out, nanoseconds]
+        self.stages = {}
+        self.failures = collections.Counter()
+
+    def _counters(self, name: str) -> typing.List[int]:
+        counters = self.stages.get(name, None)
+        if counters is None:
+            counters = self.stages[name] = [0, 0, 0]
+        return counters
+
+    def stage(self, name: str, function: typing.Callable, filters: bool = True) -> typing.Callable:
+        # function that does the same and counts calls as lines in, results that aren't None
+        # or False as lines out (every line if the stage doesn't filter)
+        counters = self._counters(name)
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                rv = function(*args, **kwargs)
+            finally:
+                counters[2] += clock() - started
+                counters[0] += 1
+            if not filters or (rv is not None and rv is not False):
+                counters[1] += 1
+            return rv
+        return timed
+
+    def iterate(self, name: str, iterable: typing.Iterable, size: typing.Callable[[typing.Any], int] = None) -> \
+            typing.Generator[typing.Any, None, None]:
+        # items of iterable, time of getting them is the stage time; size tells how many lines an item is
+        counters = self._counters(name)
+        clock = time.perf_counter_ns
+        iterator = iter(iterable)
+        while True:
+            started = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                counters[2] += clock() - started
+                return None
+            counters[2] += clock() - started
+            count = 1 if size is None else size(item)
+            counters[0] += count
+            counters[1] += count
+            yield item
+
+    def fail(self, reason: str):
+        self.failures[reason] += 1
+
+    def take(self) -> typing.Tuple[typing.Dict[str, typing.List[int]], typing.Counter[str]]:
+        # counters gathered since the last call, for worker processes to pass them on; wrapped
+        # stages keep their counter lists, so these are copied and zeroed in place
+        rv = ({name: list(counters) for name, counters in self.stages.items()}, self.failures)
+        for counters in self.stages.values():
+            counters[:] = [0, 0, 0]
+        self.failures = collections.Counter()
+        return rv
+
+    def add(self, taken: typing.Tuple[typing.Dict[str, typing.List[int]], typing.Counter[str]]):
+        stages, failures = taken
+        for name, values in stages.items():
+            counters = self._counters(name)
+            for i, value in enumerate(values):
+                counters[i] += value
+        self.failures.update(failures)
+
+    def report(self, out: typing.Optional[typing.TextIO] = None):
+        out = sys.stderr if out is None else out
+        total = time.perf_counter_ns() - self.started
+        names = [name for name in _order if name in self.stages]
+        names += sorted(name for name in self.stages if name not in _order)
+        # lines that came in, stages before 'read' may be skipped (e.g. cached lines)
+        lines = self.stages['read'][0] if 'read' in self.stages else \
+            max([counters[0] for counters in self.stages.values()] or [0])
+
+        print('%-10s %12s %12s %10s %10s %7s' % ('stage', 'lines in', 'lines out', 'seconds', 'ns/line', 'share'),
+              file=out)
+        spent = 0
+        for name in names:
+            lines_in, lines_out, ns = self.stages[name]
+            spent += ns
+            print('%-10s %12d %12d %10.3f %10d %6.1f%%' % (
+                name, lines_in, lines_out, ns / 1e9, ns // lines_in if lines_in else 0,
+                100.0 * ns / total if total else 0,
+            ), file=out)
+        # stages of worker processes run at the same time, then there's nothing to tell
+        if spent <= total:
+            print('%-10s %12s %12s %10.3f %10s %6.1f%%' % (
+                'other', '', '', (total - spent) / 1e9, '', 100.0 * (total - spent) / total if total else 0,
+            ), file=out)
+
+        text = 'total: %d lines in %.3f s, %d ns/line' % (lines, total / 1e9, total // lines if lines else 0)
+        if resource is not None:
+            # kilobytes on linux
+            text += ', peak RSS %.1f MiB' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            if children > 0:
+                text += ' (%.1f MiB the largest child process)' % (children / 1024)
+        print(text, file=out)
+
+        if len(self.failures) > 0:
+            print('parse failures:', file=out)
+            for reason, count in self.failures.most_common():
+                print('  %-40s %10d' % (reason, count), file=out)
@@ -0,0 +1,108 @@
+import sys
+import typing
+
+from input.common import json_loads
+from input.compress import compression, magic_size
+from input.log import SingleReader
+from lib.filter import FilterOptions
+from line.extractor import LineExtractor
+from line.log import LogLine, RawLine
+from line.timestamp import epoch_ns
+
+# once the range is that small it's scanned line by line
+_scan_size = 64 * 1024
+
+
+def _line_time(extractor: LineExtractor, raw_line: bytes) -> typing.Optional[int]:
+    line = extractor(raw_line.decode('utf-8', errors='replace'))
+    if line is None:
+        return None
+    try:
+        return epoch_ns(json_loads(line.json_line)['time'])
+    except Exception:
+        return None
+
+
+def _next_log_line(inp: typing.BinaryIO, offset: int, end: int, extractor: LineExtractor) -> \
+        typing.Tuple[int, int, typing.Optional[int]]:
+    # (start, end, timestamp) of the first log line that starts at or after offset and before end
+    if offset > 0:
+        # the byte before tells whether offset is a start of a line
+        inp.seek(offset - 1)
+        inp.readline()
+    else:
+        inp.seek(0)
+
+    while True:
+        start = inp.tell()
+        if start >= end:
+            return end, end, None
+        raw_line = inp.readline()
+        if not raw_line:
+            return end, end, None
+        timestamp = _line_time(extractor, raw_line)
+        if timestamp is not None:
+            return start, inp.tell(), timestamp
+
+
+def find_offset(inp: typing.BinaryIO, size: int, timestamp: int) -> int:
+    # offset of the first log line with time >= timestamp in a time ordered file, size if none
+    extractor = LineExtractor()
+    low, high = 0, size
+    while high - low > _scan_size:
+        middle = (low + high) // 2
+        start, end, line_time = _next_log_line(inp, middle, high, extractor)
+        if line_time is None or line_time >= timestamp:
+            high = middle
+        else:
+            low = end
+
+    # low is a start of a line, the answer is somewhere after it
+    while True:
+        start, end, line_time = _next_log_line(inp, low, size, extractor)
+        if line_time is None:
+            return size
+        if line_time >= timestamp:
+            return start
+        low = end
+
+
+def byte_range(inp: typing.BinaryIO, size: int, since: typing.Optional[int], until: typing.Optional[int]) -> \
+        typing.Tuple[int, int]:
+    start = 0 if since is None else find_offset(inp, size, since)
+    end = size if until is None else find_offset(inp, size, until)
+    return start, max(start, end)
+
+
+class RangeReader(object):
+    # reader of a log (segments of it, see group_logfiles) that reads only the part of every
+    # plain file between since and until (epoch ns), found by binary search over byte offsets;
+    # compressed files can't be seeked and are read whole. Files are expected to be ordered
+    # by time, lines are still checked against the range by SingleReader.
+    paths: typing.Sequence[str]
+    since: typing.Optional[int]
+    until: typing.Optional[int]
+
+    def __init__(self, paths: typing.Sequence[str], filter_options: FilterOptions, **kwargs):
+        self.paths = paths
+        self.filter = filter_options
+        self.since = kwargs.get("since", None)
+        self.until = kwargs.get("until", None)
+        self.kwargs = kwargs
+
+    def read_generator(self) -> typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        for path in self.paths:
+            with open(path, 'rb') as inp:
+                kwargs = dict(self.kwargs)
+                if compression(inp.peek(magic_size)[:magic_size]) is None:
+                    size = inp.seek(0, 2)
+                    start, end = byte_range(inp, size, self.since, self.until)
+                    if self.kwargs.get("debug", False):
+                        print("'%s': reading bytes %d-%d of %d" % (path, start, end, size), file=sys.stderr)
+                    if start == end:
+                        continue
+                    inp.seek(start)
+                    kwargs["limit"] = end - start
+                else:
+                    inp.seek(0)
+                yield from SingleReader(inp, self.filter, **kwargs).read_generator()
@@ -0,0 +1,65 @@
+import heapq
+import pickle
+import tempfile
+import typing
+
+from input.group import LineGroup, group_key, group_lines
+from line.log import LogLine, RawLine
+
+
+class ExternalSorter(object):
+    # sort of lines that don't fit into memory: groups of lines (see group_lines) are collected
+    # into runs up to memory_limit, every run is sorted and spilled into a temporary file,
+    # then the runs are merged back lazily. Sort is stable, as sorted() is.
+    memory_limit: int
+    tmp_dir: typing.Optional[str]
+
+    def __init__(self, memory_limit: int, tmp_dir: typing.Optional[str] = None, buffer_size: int = 1024 * 1024,
+                 batch_size: int = 1000):
+        self.memory_limit = memory_limit
+        self.tmp_dir = tmp_dir
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.runs: typing.List[typing.BinaryIO] = []
+
+    def _spill(self, run: typing.List[LineGroup]):
+        out = tempfile.TemporaryFile(dir=self.tmp_dir, buffering=self.buffer_size)
+        # groups are pickled in batches, every pickle has its own memo, so neither side
+        # keeps references to everything it has seen
+        for start in range(0, len(run), self.batch_size):
+            pickle.dump(run[start:start + self.batch_size], out, protocol=pickle.HIGHEST_PROTOCOL)
+        out.seek(0)
+        self.runs.append(out)
+
+    @staticmethod
+    def _read_run(inp: typing.BinaryIO) -> typing.Generator[LineGroup, None, None]:
+        try:
+            while True:
+                try:
+                    batch = pickle.load(inp)
+                except EOFError:
+                    return None
+                yield from batch
+        finally:
+            inp.close()
+
+    def sort(self, lines: typing.Iterable[typing.Union[LogLine, RawLine]]) -> \
+            typing.Generator[typing.Union[LogLine, RawLine], None, None]:
+        run = []
+        run_size = 0
+        for group in group_lines(lines):
+            run.append(group)
+            for line in group:
+                run_size += line.memory_size()
+            if run_size >= self.memory_limit:
+                run.sort(key=group_key)
+                self._spill(run)
+                run = []
+                run_size = 0
+        run.sort(key=group_key)
+
+        # the last run stays in memory, it's the latest one so it goes last to the merge
+        streams = [self._read_run(inp) for inp in self.runs] + [iter(run)]
+        self.runs = []
+        for group in heapq.merge(*streams, key=group_key):
+            yield from group
@@ -0,0 +1,118 @@
+import io
+import mmap
+import os
+import stat
+import typing
+
+from input.compress import ThreadedReader, compression, decompressor, magic_size
+
+default_block_size = 4 * 1024 * 1024
+
+
+def _regular_file_size(fd: int) -> int:
+    try:
+        st = os.fstat(fd)
+    except OSError:
+        return -1
+    if not stat.S_ISREG(st.st_mode):
+        return -1
+    return st.st_size
+
+
+def _limited(lines: typing.Iterator[bytes], limit: int) -> typing.Generator[bytes, None, None]:
+    for line in lines:
+        if limit <= 0:
+            return None
+        limit -= len(line)
+        yield line
+
+
+class LineSource(object):
+    # raw (undecoded) lines of a stream: regular files are mapped into memory,
+    # pipes are read through a large buffer, compressed data is decompressed;
+    # lines keep their trailing '\n'. With limit only lines that start within
+    # that many bytes from the current position are read.
+    input: typing.IO
+    block_size: int
+    limit: typing.Optional[int]
+
+    def __init__(self, inp: typing.IO, block_size: int = default_block_size, limit: typing.Optional[int] = None):
+        self.input = inp
+        self.block_size = block_size
+        self.limit = limit
+        self.lines = None
+
+    def _fileno(self) -> int:
+        try:
+            return self.input.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return -1
+
+    @staticmethod
+    def _read_mmap(mapped: mmap.mmap, position: int) -> typing.Generator[bytes, None, None]:
+        with mapped:
+            mapped.seek(position)
+            yield from iter(mapped.readline, b'')
+
+    def _read_buffered(self, fd: int) -> typing.Generator[bytes, None, None]:
+        with open(fd, 'rb', buffering=self.block_size, closefd=False) as inp:
+            kind = compression(inp.peek(magic_size)[:magic_size])
+            if kind is None:
+                yield from inp
+                return None
+
+            with io.BufferedReader(ThreadedReader(decompressor(kind, inp)), self.block_size) as decompressed:
+                yield from decompressed
+
+    def _position(self, fd: int) -> int:
+        # buffered objects may have read ahead of the descriptor
+        try:
+            return getattr(self.input, 'buffer', self.input).tell()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return os.lseek(fd, 0, os.SEEK_CUR)
+
+    def _generator(self) -> typing.Iterator[bytes]:
+        inp = self.input
+        if isinstance(inp, io.TextIOBase) and not hasattr(inp, 'buffer'):
+            # in-memory text stream, nothing to gain here
+            return (line.encode('utf-8', errors='surrogateescape') for line in inp)
+
+        fd = self._fileno()
+        if fd == -1:
+            return iter(getattr(inp, 'buffer', inp))
+
+        # streams that were never read from are expected here, so there is no data buffered
+        # in python objects that would be skipped
+        if _regular_file_size(fd) > 0:
+            position = self._position(fd)
+            if compression(os.pread(fd, magic_size, position)) is None:
+                try:
+                    return self._read_mmap(mmap.mmap(fd, 0, access=mmap.ACCESS_READ), position)
+                except (OSError, ValueError):
+                    pass
+            os.lseek(fd, position, os.SEEK_SET)
+        return self._read_buffered(fd)
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        if self.lines is None:
+            self.lines = self._generator()
+            if self.limit is not None:
+                self.lines = _limited(self.lines, self.limit)
+        return self.lines
+
+    def readline(self) -> bytes:
+        return next(iter(self), b'')
+
+    def read_chunks(self, chunk_size: int) -> typing.Generator[typing.List[bytes], None, None]:
+        chunk = []
+        size = 0
+        for line in self:
+            chunk.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield chunk
+                chunk = []
+                size = 0
+
+        if len(chunk) > 0:
+            yield chunk
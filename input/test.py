@@ -1,47 +1,58 @@
-import json
 import sys
 import typing
 
-from input.common import json_object_multiple_unique
+from input.common import json_loads, json_loads_plain
+from input.source import LineSource, default_block_size
 from line.test import TestCommonEvent, parse_test_line
 
 
 class TestReader(object):
-    input: typing.TextIO
+    input: typing.IO
 
-    def __init__(self, inp: typing.Optional[typing.TextIO], **kwargs):
+    def __init__(self, inp: typing.Optional[typing.IO], **kwargs):
         self.input = inp
         if self.input is None:
             self.input = sys.stdin
+        self.source = LineSource(self.input, kwargs.get("block_size", default_block_size))
 
         self.debug = kwargs.get("debug", False)
+        # go test -json has a fixed schema, without strict checks events are decoded as they are:
+        # no duplicate keys handling, unknown keys are ignored
+        self.strict = kwargs.get("strict", True)
+
+    def parse_line(self, raw_line: bytes) -> typing.Optional[TestCommonEvent]:
+        try:
+            if self.strict:
+                parsed_line = json_loads(raw_line.decode('utf-8', errors='replace'))
+            else:
+                parsed_line = json_loads_plain(raw_line)
+        except Exception as e:
+            if self.debug:
+                print("failed to parse json [%s]: '%s'" % (str(e), raw_line.decode('utf-8', errors='replace').strip()),
+                      file=sys.stderr)
+            return None
+
+        try:
+            return parse_test_line(parsed_line, self.strict)
+        except Exception as e:
+            if self.debug:
+                print("failed to disassemble log line [%s]: '%s'" % (
+                    str(e), raw_line.decode('utf-8', errors='replace').strip()), file=sys.stderr)
+            return None
 
     def read_line(self) -> typing.Union[TestCommonEvent, None]:
         while True:
-            raw_line = self.input.readline()
-            if raw_line is None or raw_line == "":
+            raw_line = self.source.readline()
+            if raw_line == b"":
                 return None
 
-            try:
-                parsed_line = json.loads(raw_line, object_pairs_hook=json_object_multiple_unique)
-            except Exception as e:
-                if self.debug:
-                    print("failed to parse json [%s]: '%s'" % (str(e), raw_line.strip()), file=sys.stderr)
-                continue
-
-            try:
-                test_line = parse_test_line(parsed_line)
-            except Exception as e:
-                if self.debug:
-                    print("failed to disassemble log line [%s]: '%s'" % (str(e), raw_line.strip()), file=sys.stderr)
-                continue
-
-            return test_line
+            test_line = self.parse_line(raw_line)
+            if test_line is not None:
+                return test_line
 
     def read_generator(self) -> typing.Generator[TestCommonEvent, None, None]:
-        while True:
-            line = self.read_line()
-            if line is None:
-                return None
-            yield line
-
+        parse_line = self.parse_line
+        for raw_line in self.source:
+            line = parse_line(raw_line)
+            if line is not None:
+                yield line
@@ -1,3 +1,4 @@
+import operator
 import re
 
 import typing
@@ -7,44 +8,126 @@ fatal_prefix = 'FATAL: '
 force_color: bool = None
 
 
-class Line(object):
-    def __init__(self, instance, json_line):
-        self.instance = instance
-        self.json_line = json_line
+class Line(tuple):
+    # (instance, json_line); it's made for every line, and a tuple is made without running any python code
+    __slots__ = ()
+
+    instance = property(operator.itemgetter(0))
+    json_line = property(operator.itemgetter(1))
+
+
+_digits = '0123456789'
+_time_chars = '0123456789-TZ'
+
+
+class LineFormat(object):
+    regexp: typing.Pattern
+    # True if extract isn't just a regexp search
+    custom = False
+
+    def __init__(self, regexp: str):
+        self.regexp = re.compile(regexp)
+        self.search = self.regexp.search
+
+    def extract_regexp(self, raw_line: str) -> typing.Optional[Line]:
+        match = self.search(raw_line)
+        if match is None:
+            return None
+        return Line(match.groups())
+
+    # regexp is as fast as anything else where it doesn't backtrack over the line, formats
+    # where it does find the same groups with str.find/rfind and fall back to it on unusual lines
+    extract = extract_regexp
+
+
+def _json_tail(raw_line: str, start: int) -> typing.Optional[str]:
+    # '({.*})' starting at raw_line[start] == '{', None if it doesn't match
+    end = raw_line.rfind('}')
+    if end < start or raw_line.find('\n', start, end) != -1:
+        return None
+    return raw_line[start:end + 1]
+
+
+class InsolardFormat(LineFormat):
+    # <time> <instance>/insolard_<name>.log <json>
+    custom = True
+
+    def __init__(self):
+        super(InsolardFormat, self).__init__('[0-9\-TZ]+ (\d+)/insolard_.*.log ({.*})')
+
+    def extract(self, raw_line: str) -> typing.Optional[Line]:
+        pos = raw_line.find('/insolard_')
+        if pos == -1:
+            return None
+        sep = raw_line.find('log {', pos + 11)
+        if sep == -1:
+            return None
+        if raw_line.find('/insolard_', pos + 1) != -1 or raw_line.find('log {', sep + 1) != -1 or \
+                raw_line.find('\n', pos, sep) != -1:
+            return self.extract_regexp(raw_line)
+
+        head = raw_line[:pos]
+        start = len(head.rstrip(_digits))
+        if start == pos or start < 2 or head[start - 1] != ' ' or head[start - 2] not in _time_chars:
+            return self.extract_regexp(raw_line)
+
+        json_line = _json_tail(raw_line, sep + 4)
+        if json_line is None:
+            return self.extract_regexp(raw_line)
+        return Line((raw_line[start:pos], json_line))
 
 
 class LineExtractor(object):
-    re: typing.Collection[typing.Pattern] = [
-        re.compile('[0-9\-TZ]+ .+-(\d+) [^ ]+: ({.*})'),  # time host-%d ???: <log>
-        re.compile('[0-9\-TZ]+ (\d+)/insolard_.*.log ({.*})'),  # time host-%d ???: <log>
-        re.compile('(\d+)/\w+.log:\d+:({.*})'),  # dir-%d/output.log:line:<log>
-        re.compile('(\d+)/\w+.log:({.*})'),  # dir-%d/output.log:<log>
-        re.compile('()({.*})')
+    formats: typing.Sequence[LineFormat] = [
+        LineFormat('[0-9\-TZ]+ .+-(\d+) [^ ]+: ({.*})'),  # time host-%d ???: <log>
+        InsolardFormat(),  # time host-%d ???: <log>
+        LineFormat('(\d+)/\w+.log:\d+:({.*})'),  # dir-%d/output.log:line:<log>
+        LineFormat('(\d+)/\w+.log:({.*})'),  # dir-%d/output.log:<log>
+        LineFormat('()({.*})'),
     ]
-    extractor: typing.Optional[typing.Pattern]
+    extractor: typing.Optional[LineFormat]
+    # regexp search of the format or its extract if it's custom, the other one is None
+    search: typing.Optional[typing.Callable[[str], typing.Optional[typing.Match]]]
+    extract: typing.Optional[typing.Callable[[str], typing.Optional[Line]]]
 
     def __init__(self):
         self.extractor = None
+        self.search = None
+        self.extract = None
 
-    @staticmethod
-    def _deduce_extractor(line: str) -> typing.Optional[typing.Pattern]:
-        for line_regexp in LineExtractor.re:
-            match = line_regexp.search(line)
-            if match is not None:
-                return line_regexp
+    def _deduce_extractor(self, raw_line: str) -> typing.Optional[Line]:
+        self.extractor = None
+        self.search = None
+        self.extract = None
+
+        # every format ends with json object
+        if '{' not in raw_line:
+            return None
+
+        formats = LineExtractor.formats
+        # bare json doesn't need to be checked against prefixed formats
+        if raw_line[0] == '{':
+            formats = formats[-1:]
+        for line_format in formats:
+            line = line_format.extract(raw_line)
+            if line is not None:
+                self.extractor = line_format
+                if line_format.custom:
+                    self.extract = line_format.extract
+                else:
+                    self.search = line_format.search
+                return line
         return None
 
     def __call__(self, raw_line: str) -> typing.Optional[Line]:
-        if self.extractor is None:
-            self.extractor = self._deduce_extractor(raw_line)
-        if self.extractor is None:
-            return None
-        match = self.extractor.search(raw_line)
-        if match is None:
-            self.extractor = self._deduce_extractor(raw_line)
-            if self.extractor is None:
-                return None
-            match = self.extractor.search(raw_line)
-            if match is None:
-                return None
-        return Line(match.group(1), match.group(2))
+        # it's done for every line, so regexp formats are searched right here
+        search = self.search
+        if search is not None:
+            match = search(raw_line)
+            if match is not None:
+                return Line(match.groups())
+        elif self.extract is not None:
+            line = self.extract(raw_line)
+            if line is not None:
+                return line
+        return self._deduce_extractor(raw_line)
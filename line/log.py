@@ -1,19 +1,40 @@
-import copy
 import datetime
+import sys
 import typing
 
 from lib.emoji import random_emoji
-from lib.utils import isoparse
+from line.timestamp import epoch_ns, isoparse
 
 
 class RawLine(object):
+    __slots__ = ('message',)
+
     message: str
 
     def __init__(self, message: str):
         self.message = message.rstrip()
 
+    def memory_size(self) -> int:
+        # rough estimation for memory budgets
+        return 80 + len(self.message)
+
+    def __getstate__(self):
+        return self.message
+
+    def __setstate__(self, state):
+        self.message = state
+
+
+def _intern(value: typing.Any) -> typing.Any:
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
 
 class LogLine(object):
+    __slots__ = ('node', 'role', 'level', 'caller', 'message', 'traceid', 'timestamp_raw', 'backtrace', 'pulse',
+                 '_timestamp', '_timestamp_key', '_line', '_fields')
+
     node: str
     role: str
     level: str
@@ -21,46 +42,92 @@ class LogLine(object):
     message: str
     traceid: str
     timestamp_raw: str
-    timestamp: datetime.datetime
-    fields: typing.Mapping[str, typing.Any]
 
     backtrace: typing.Optional[str]
     pulse: typing.Optional[str]
 
-    def __init__(self, line: typing.Dict[str, typing.Any]):
-        old_line = line
-        line = copy.copy(line)
-
-        self.node = line.pop('nodeid', "<empty>")
-        self.role = line.pop('role', None)
-        self.message = line.pop('message').strip()
-        self.timestamp_raw = line.pop('time')
-        self.timestamp = isoparse(self.timestamp_raw)
-        if 'caller' not in line:
-            self.caller = None
-        else:
-            self.caller = line.pop('caller')
+    _timestamp: typing.Optional[datetime.datetime]
+    _timestamp_key: int
+    _line: typing.Optional[typing.Dict[str, typing.Any]]
+    _fields: typing.Optional[typing.Dict[str, typing.Any]]
 
-        self.backtrace = line.pop('Backtrace', None)
+    def __init__(self, line: typing.Dict[str, typing.Any]):
+        # LogLine takes ownership of the parsed line, it becomes 'fields' once somebody needs them
+        self._line = line
+        self._fields = None
+
+        self.node = _intern(line.get('nodeid', "<empty>"))
+        self.role = _intern(line.get('role', None))
+        self.message = line['message'].strip()
+        self.timestamp_raw = line['time']
+        self._timestamp = None
+        # parsed right away, so that a line with a broken time is turned into RawLine by its reader
+        self._timestamp_key = epoch_ns(self.timestamp_raw)
+        self.caller = _intern(line.get('caller', None))
+
+        self.backtrace = line.get('Backtrace', None)
         if self.backtrace is None:
-            self.backtrace = line.pop('backtrace', None)
+            self.backtrace = line.get('backtrace', None)
 
-        self.level = line.pop('level')
+        self.level = _intern(line['level'])
         if self.message.startswith('FATAL: '):
             self.level = 'fatal'
 
         self.traceid = line.get('traceid', None)
 
-        pulse = line.pop('pulse', None)
+        pulse = line.get('pulse', None)
         if pulse is None:
-            pulse = line.pop('new_pulse', None)
+            pulse = line.get('new_pulse', None)
         if isinstance(pulse, (list, tuple)):
             pulse = pulse[0]
         self.pulse = pulse
 
-        self.fields = line
-        self.fields.pop('writeDuration', None)
-        self.fields.pop('loginstance', None)
+    def memory_size(self) -> int:
+        # rough estimation for memory budgets, the line itself with interned strings shared
+        # with other lines takes about 400 bytes, every decoded field about 150 more
+        fields = self._line if self._line is not None else self._fields
+        return 400 + len(self.message) + 150 * len(fields)
+
+    # pickled (spilled runs, worker processes) as a bare tuple without attribute names;
+    # datetime is cheap to get back, so it's not stored
+    def __getstate__(self):
+        return (self.node, self.role, self.level, self.caller, self.message, self.traceid, self.timestamp_raw,
+                self.backtrace, self.pulse, self._timestamp_key, self._line, self._fields)
+
+    def __setstate__(self, state):
+        (node, role, level, caller, self.message, self.traceid, self.timestamp_raw,
+         self.backtrace, self.pulse, self._timestamp_key, self._line, self._fields) = state
+        self.node = _intern(node)
+        self.role = _intern(role)
+        self.level = _intern(level)
+        self.caller = _intern(caller)
+        self._timestamp = None
+
+    @property
+    def timestamp(self) -> datetime.datetime:
+        if self._timestamp is None:
+            self._timestamp = isoparse(self.timestamp_raw)
+        return self._timestamp
+
+    @property
+    def timestamp_key(self) -> int:
+        # nanoseconds since epoch, cheaper to get and to compare than timestamp
+        return self._timestamp_key
+
+    @property
+    def fields(self) -> typing.Mapping[str, typing.Any]:
+        if self._fields is None:
+            line = self._line
+            for key in ('nodeid', 'role', 'message', 'time', 'caller', 'level', 'writeDuration', 'loginstance'):
+                line.pop(key, None)
+            if line.pop('Backtrace', None) is None:
+                line.pop('backtrace', None)
+            if line.pop('pulse', None) is None:
+                line.pop('new_pulse', None)
+            # rebuilt so that the dict doesn't keep the room of the popped keys
+            self._fields = dict(line)
+            self._line = None
+        return self._fields
 
 
 class NodeDefinition(object):
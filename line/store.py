@@ -0,0 +1,93 @@
+import array
+import typing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Dictionary(object):
+    # dictionary encoding of a column with few distinct values
+    values: typing.List[typing.Any]
+    codes: typing.Dict[typing.Any, int]
+
+    def __init__(self, values: typing.Optional[typing.List[typing.Any]] = None):
+        self.values = [] if values is None else values
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: typing.Any) -> int:
+        code = self.codes.get(value, None)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> typing.Any:
+        return self.values[code]
+
+
+class LineStore(object):
+    # columnar storage of log lines of one log: byte offsets of lines in it are int64 and their
+    # traceids are a dictionary encoded int32 column. The rest of a line stays in the log, which
+    # is the shared buffer lines are read back from by offset. Columns are plain arrays, numpy
+    # (if available) works on them without copying.
+    offsets: array.array
+    traceids: array.array
+    dictionary: Dictionary
+
+    def __init__(self):
+        self.offsets = array.array('q')
+        self.traceids = array.array('i')
+        self.dictionary = Dictionary()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, trace_id: str, offset: int):
+        self.offsets.append(offset)
+        self.traceids.append(self.dictionary.encode(trace_id))
+
+    def select(self, trace_ids: typing.Container[str]) -> typing.List[typing.Tuple[int, str]]:
+        # (offset, trace_id) of lines of the traces, in store order
+        codes = [code for code, trace_id in enumerate(self.dictionary.values) if trace_id in trace_ids]
+        if len(codes) == 0:
+            return []
+        decode = self.dictionary.decode
+        if numpy is not None:
+            traceids = numpy.frombuffer(self.traceids, dtype=numpy.int32)
+            mask = numpy.isin(traceids, codes)
+            offsets = numpy.frombuffer(self.offsets, dtype=numpy.int64)[mask]
+            return list(zip(offsets.tolist(), map(decode, traceids[mask].tolist())))
+
+        wanted = set(codes)
+        return [(offset, decode(code)) for offset, code in zip(self.offsets, self.traceids) if code in wanted]
+
+    def __getstate__(self):
+        return self.offsets.tobytes(), self.traceids.tobytes(), self.dictionary.values
+
+    def __setstate__(self, state):
+        offsets, traceids, values = state
+        self.offsets = array.array('q')
+        self.offsets.frombytes(offsets)
+        self.traceids = array.array('i')
+        self.traceids.frombytes(traceids)
+        self.dictionary = Dictionary(values)
+
+    @staticmethod
+    def is_state(state: typing.Any) -> bool:
+        # columns of a valid state are of the same length and every code is in the dictionary
+        if type(state) is not tuple or len(state) != 3:
+            return False
+        offsets, traceids, values = state
+        if type(offsets) is not bytes or type(traceids) is not bytes or type(values) is not list:
+            return False
+        if len(offsets) % 8 != 0 or len(traceids) % 4 != 0 or len(offsets) // 8 != len(traceids) // 4:
+            return False
+        if not all(type(value) is str for value in values) or len(set(values)) != len(values):
+            return False
+        if len(traceids) == 0:
+            return True
+        codes = array.array('i')
+        codes.frombytes(traceids)
+        return min(codes) >= 0 and max(codes) < len(values)
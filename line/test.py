@@ -2,7 +2,7 @@ from datetime import datetime
 import typing
 
 from input.common import JSONObject
-from lib.utils import isoparse
+from line.timestamp import isoparse
 
 
 class NotEmptyError(Exception):
@@ -22,58 +22,66 @@ class TestCommonEvent(object):
     time_raw: str
     package:  str
 
-    def __init__(self, inp: JSONObject):
+    # strict events check that there are no unknown keys, it costs a mutation of the input
+    def __init__(self, inp: JSONObject, strict: bool = True):
         self.time_raw = inp["Time"]
         self.time = isoparse(self.time_raw)
         self.package = inp["Package"]
 
-        del inp["Time"]
-        del inp["Package"]
-        del inp["Action"]
+        if strict:
+            del inp["Time"]
+            del inp["Package"]
+            del inp["Action"]
 
 
 class TestRunEvent(TestCommonEvent):
     test: str
 
-    def __init__(self, inp: JSONObject):
-        super(TestRunEvent, self).__init__(inp)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestRunEvent, self).__init__(inp, strict)
         self.test = inp["Test"]
 
-        del inp["Test"]
-        check_empty(inp)
+        if strict:
+            del inp["Test"]
+            check_empty(inp)
 
 
 class TestPauseEvent(TestCommonEvent):
     test: str
 
-    def __init__(self, inp: JSONObject):
-        super(TestPauseEvent, self).__init__(inp)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestPauseEvent, self).__init__(inp, strict)
         self.test = inp["Test"]
 
-        del inp["Test"]
-        check_empty(inp)
+        if strict:
+            del inp["Test"]
+            check_empty(inp)
 
 
 class TestContinueEvent(TestCommonEvent):
     test: str
 
-    def __init__(self, inp: JSONObject):
-        super(TestContinueEvent, self).__init__(inp)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestContinueEvent, self).__init__(inp, strict)
         self.test = inp["Test"]
 
-        del inp["Test"]
-        check_empty(inp)
+        if strict:
+            del inp["Test"]
+            check_empty(inp)
 
 
 class TestPassEvent(TestCommonEvent):
     test: typing.Optional[str]
     elapsed: float
 
-    def __init__(self, inp: JSONObject):
-        super(TestPassEvent, self).__init__(inp)
-        self.test = inp.pop("Test", None)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestPassEvent, self).__init__(inp, strict)
         self.elapsed = inp["Elapsed"]
+        if not strict:
+            self.test = inp.get("Test", None)
+            return
 
+        self.test = inp.pop("Test", None)
         del inp["Elapsed"]
         check_empty(inp)
 
@@ -82,11 +90,14 @@ class TestFailEvent(TestCommonEvent):
     test: typing.Optional[str]
     elapsed: float
 
-    def __init__(self, inp: JSONObject):
-        super(TestFailEvent, self).__init__(inp)
-        self.test = inp.pop("Test", None)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestFailEvent, self).__init__(inp, strict)
         self.elapsed = float(inp["Elapsed"])
+        if not strict:
+            self.test = inp.get("Test", None)
+            return
 
+        self.test = inp.pop("Test", None)
         del inp["Elapsed"]
         check_empty(inp)
 
@@ -95,11 +106,14 @@ class TestOutputEvent(TestCommonEvent):
     test: typing.Optional[str]
     message: str
 
-    def __init__(self, inp: JSONObject):
-        super(TestOutputEvent, self).__init__(inp)
-        self.test = inp.pop("Test", None)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestOutputEvent, self).__init__(inp, strict)
         self.message = inp["Output"]
+        if not strict:
+            self.test = inp.get("Test", None)
+            return
 
+        self.test = inp.pop("Test", None)
         del inp["Output"]
         check_empty(inp)
 
@@ -108,23 +122,26 @@ class TestSkipEvent(TestCommonEvent):
     test: typing.Optional[str]
     elapsed: float
 
-    def __init__(self, inp: JSONObject):
-        super(TestSkipEvent, self).__init__(inp)
-        self.test = inp.pop("Test", None)
+    def __init__(self, inp: JSONObject, strict: bool = True):
+        super(TestSkipEvent, self).__init__(inp, strict)
         self.elapsed = inp["Elapsed"]
+        if not strict:
+            self.test = inp.get("Test", None)
+            return
 
+        self.test = inp.pop("Test", None)
         del inp["Elapsed"]
         check_empty(inp)
 
 
 parse_callbacks = {
-    "run": lambda x: TestRunEvent(x),
-    "pause": lambda x: TestPauseEvent(x),
-    "cont": lambda x: TestContinueEvent(x),
-    "pass": lambda x: TestPassEvent(x),
-    "fail": lambda x: TestFailEvent(x),
-    "output": lambda x: TestOutputEvent(x),
-    "skip": lambda x: TestSkipEvent(x),
+    "run": TestRunEvent,
+    "pause": TestPauseEvent,
+    "cont": TestContinueEvent,
+    "pass": TestPassEvent,
+    "fail": TestFailEvent,
+    "output": TestOutputEvent,
+    "skip": TestSkipEvent,
 }
 
 
@@ -139,8 +156,8 @@ TestEvent = typing.NewType("TestEvent", typing.Union[
 ])
 
 
-def parse_test_line(inp: JSONObject) -> typing.Optional[TestEvent]:
+def parse_test_line(inp: JSONObject, strict: bool = True) -> typing.Optional[TestEvent]:
     cb = parse_callbacks.get(inp["Action"], None)
     if cb is None:
         return None
-    return cb(inp)
+    return cb(inp, strict)
@@ -0,0 +1,162 @@
+import datetime
+import typing
+
+from lib.utils import isoparse as _isoparse_slow
+
+_epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_ns_in_second = 1000000000
+
+
+def _native_rfc3339() -> bool:
+    # python 3.11+ parses 'Z' and nanoseconds in C, nothing written in python beats it
+    try:
+        datetime.datetime.fromisoformat('2019-09-10T15:04:05.123456789Z')
+    except ValueError:
+        return False
+    return True
+
+
+_fromisoformat = datetime.datetime.fromisoformat if _native_rfc3339() else None
+
+
+def _tzinfo(suffix: str) -> typing.Optional[datetime.tzinfo]:
+    if suffix == '':
+        return None
+    if suffix in ('Z', 'z'):
+        return datetime.timezone.utc
+    offset = datetime.timedelta(hours=int(suffix[1:3]), minutes=int(suffix[4:6]))
+    if suffix[0] == '-':
+        offset = -offset
+    return datetime.timezone(offset)
+
+
+def to_epoch_ns(value: datetime.datetime) -> int:
+    # naive timestamps are treated as UTC ones
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    delta = value - _epoch
+    return (delta.days * 86400 + delta.seconds) * _ns_in_second + delta.microseconds * 1000
+
+
+class TimestampParser(object):
+    # RFC3339 timestamps of consecutive lines share 'YYYY-MM-DDTHH:MM' and the zone, so
+    # the minute is computed once and only seconds and fraction are parsed for every line
+    cache: typing.Dict[typing.Tuple[str, str], typing.Tuple[datetime.datetime, int]]
+    cache_size: int
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def _minute(self, prefix: str, suffix: str) -> typing.Optional[typing.Tuple[datetime.datetime, int]]:
+        key = (prefix, suffix)
+        rv = self.cache.get(key, None)
+        if rv is not None:
+            return rv
+
+        if prefix[4] != '-' or prefix[7] != '-' or prefix[10] not in 'Tt ' or prefix[13] != ':':
+            return None
+        digits = prefix[0:4] + prefix[5:7] + prefix[8:10] + prefix[11:13] + prefix[14:16] + suffix[1:3] + suffix[4:6]
+        if not digits.isdigit() or not digits.isascii():
+            return None
+        try:
+            minute = datetime.datetime(int(prefix[0:4]), int(prefix[5:7]), int(prefix[8:10]),
+                                       int(prefix[11:13]), int(prefix[14:16]), tzinfo=_tzinfo(suffix))
+        except ValueError:
+            return None
+
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        rv = self.cache[key] = (minute, to_epoch_ns(minute))
+        return rv
+
+    def _split(self, raw: str) -> typing.Optional[typing.Tuple[datetime.datetime, int, int, int]]:
+        last = raw[-1:]
+        if last == 'Z' or last == 'z':
+            end = len(raw) - 1
+        elif len(raw) >= 25 and raw[-3] == ':' and raw[-6] in '+-':
+            end = len(raw) - 6
+        else:
+            end = len(raw)
+
+        if end < 19 or raw[16] != ':':
+            return None
+        if end == 19:
+            fraction = ''
+        elif raw[19] != '.' or end == 20:
+            return None
+        else:
+            fraction = raw[20:end]
+        digits = raw[17:19] + fraction
+        if not digits.isdigit() or not digits.isascii():
+            return None
+
+        minute = self._minute(raw[:16], raw[end:])
+        if minute is None:
+            return None
+        # fraction beyond nanoseconds is truncated
+        return minute[0], minute[1], int(raw[17:19]), int((fraction + '000000000')[:9])
+
+    def isoparse(self, raw: str) -> datetime.datetime:
+        if _fromisoformat is not None:
+            try:
+                return _fromisoformat(raw)
+            except ValueError:
+                return _isoparse_slow(raw)
+
+        split = self._split(raw)
+        if split is not None:
+            minute, _, seconds, nanoseconds = split
+            try:
+                # microseconds are truncated, as dateutil does
+                return minute.replace(second=seconds, microsecond=nanoseconds // 1000)
+            except ValueError:
+                pass
+        return _isoparse_slow(raw)
+
+    def epoch_ns(self, raw: str) -> int:
+        split = self._split(raw)
+        if split is None or split[2] > 59:
+            return to_epoch_ns(_isoparse_slow(raw))
+        return split[1] + split[2] * _ns_in_second + split[3]
+
+    def clock(self, raw: str) -> typing.Optional[str]:
+        # 'HH:MM:SS.ffffff' as strftime renders isoparse(raw), without parsing the date;
+        # None if the timestamp isn't a plain RFC3339 one
+        last = raw[-1:]
+        if last == 'Z' or last == 'z':
+            end = len(raw) - 1
+        elif len(raw) >= 25 and raw[-3] == ':' and raw[-6] in '+-':
+            end = len(raw) - 6
+        else:
+            end = len(raw)
+
+        if end < 19 or raw[13] != ':' or raw[16] != ':':
+            return None
+        if end == 19:
+            fraction = ''
+        elif raw[19] != '.' or end == 20:
+            return None
+        else:
+            fraction = raw[20:end]
+        digits = raw[11:13] + raw[14:16] + raw[17:19] + fraction
+        if not digits.isdigit() or not digits.isascii() or digits[0:2] > '23' or digits[2] > '5' or digits[4] > '5':
+            return None
+        return raw[11:19] + '.' + (fraction + '000000')[:6]
+
+    def isoparse_many(self, raw_list: typing.Iterable[str]) -> typing.List[datetime.datetime]:
+        isoparse = self.isoparse
+        return [isoparse(raw) for raw in raw_list]
+
+    def epoch_ns_many(self, raw_list: typing.Iterable[str]) -> typing.List[int]:
+        epoch_ns = self.epoch_ns
+        return [epoch_ns(raw) for raw in raw_list]
+
+
+_parser = TimestampParser()
+
+isoparse = _parser.isoparse
+clock = _parser.clock
+epoch_ns = _parser.epoch_ns
+isoparse_many = _parser.isoparse_many
+epoch_ns_many = _parser.epoch_ns_many
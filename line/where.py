@@ -0,0 +1,304 @@
+import json
+import operator
+import re
+import typing
+
+from line.log import LogLine
+from line.timestamp import epoch_ns
+
+# expression language of --where, e.g.
+#   level>=warn && node=="insolar:1AAEAAbJ..." && fields.pulse>65537 && message~"timeout"
+#   time>="2019-09-10T15:04:05Z" && time<"2019-09-10T15:09:05Z" && !(caller~"^network/")
+# operands are level, node, role, caller, message, traceid, backtrace, pulse, time and
+# fields.<name>; operators are == != < <= > >= ~ (regexp search) !~, && || ! and parentheses.
+# Values are json strings, numbers or bare words. Comparison with a missing value is false.
+
+_tokens = re.compile(r'''
+    \s*(?:
+      (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<number>-?\d+(?:\.\d+)?(?![\w.:-]))
+    | (?P<op>&&|\|\||==|!=|<=|>=|!~|<|>|~|!|\(|\))
+    | (?P<word>[A-Za-z_0-9][\w.:\-]*)
+    )''', re.VERBOSE)
+
+_level_ranks = {'debug': 0, 'info': 1, 'warn': 2, 'warning': 2, 'error': 3, 'fatal': 4, 'panic': 5}
+
+# operand -> (attribute of LogLine, cost of getting it)
+_attributes = {
+    'level': ('level', 1),
+    'node': ('node', 1),
+    'nodeid': ('node', 1),
+    'role': ('role', 1),
+    'caller': ('caller', 1),
+    'traceid': ('traceid', 1),
+    'message': ('message', 1),
+    'backtrace': ('backtrace', 1),
+    'pulse': ('pulse', 1),
+    'time': ('timestamp_key', 2),
+}
+# fields are decoded from json on the first access, it's by far the most expensive check
+_field_cost = 20
+
+# operand -> json key it comes from, for raw text pre-checks
+_raw_keys = {'node': 'nodeid', 'nodeid': 'nodeid', 'role': 'role', 'caller': 'caller', 'traceid': 'traceid'}
+
+_comparisons = {'==': '==', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+
+def _ordered(op: typing.Callable[[typing.Any, typing.Any], bool]) -> typing.Callable[[typing.Any, typing.Any], bool]:
+    def compare(value, literal) -> bool:
+        try:
+            return value is not None and op(value, literal)
+        except TypeError:
+            return False
+    return compare
+
+
+def _search(pattern: typing.Pattern, value: typing.Any) -> bool:
+    return isinstance(value, str) and pattern.search(value) is not None
+
+
+def _contains(needle: str, value: typing.Any) -> bool:
+    return isinstance(value, str) and needle in value
+
+
+class Node(object):
+    cost: int
+
+    def source(self, consts: typing.List[typing.Any]) -> str:
+        raise NotImplementedError()
+
+    def needles(self) -> typing.Optional[typing.List[typing.Tuple[str, bool]]]:
+        # (substring, quoted) any of which json of a matching line contains, None if unknown
+        return None
+
+
+class Compare(Node):
+    def __init__(self, operand: str, op: str, value: typing.Any):
+        self.operand = operand
+        self.op = op
+        self.value = value
+
+        if operand.startswith('fields.') and len(operand) > len('fields.'):
+            self.cost = _field_cost
+        elif operand in _attributes:
+            self.cost = _attributes[operand][1]
+        else:
+            raise ValueError("unknown operand '%s'" % operand)
+        if op in ('~', '!~'):
+            self.cost += 2
+
+    def _const(self, consts: typing.List[typing.Any], value: typing.Any) -> str:
+        consts.append(value)
+        return 'c%d' % (len(consts) - 1)
+
+    def source(self, consts: typing.List[typing.Any]) -> str:
+        if self.operand.startswith('fields.'):
+            value = 'line.fields.get(%s)' % self._const(consts, self.operand[len('fields.'):])
+        else:
+            value = 'line.' + _attributes[self.operand][0]
+
+        if self.op in ('~', '!~'):
+            if not isinstance(self.value, str):
+                raise ValueError("'%s' needs a string to match" % self.op)
+            try:
+                pattern = re.compile(self.value)
+            except re.error as e:
+                raise ValueError("invalid regexp '%s': %s" % (self.value, str(e)))
+            if re.escape(self.value) == self.value:
+                # plain substring, no need for regexp engine
+                rv = 'contains(%s, %s)' % (self._const(consts, self.value), value)
+            else:
+                rv = 'search(%s, %s)' % (self._const(consts, pattern), value)
+            return rv if self.op == '~' else '(%s is not None and not %s)' % (value, rv)
+
+        literal = self.value
+        if self.operand == 'time':
+            if not isinstance(literal, str):
+                raise ValueError("time is compared with RFC3339 strings, got %r" % literal)
+            try:
+                literal = epoch_ns(literal)
+            except Exception:
+                raise ValueError("invalid time '%s'" % self.value)
+            return '(%s %s %s)' % (value, _comparisons[self.op], self._const(consts, literal))
+
+        if self.operand == 'level' and self.op not in ('==', '!='):
+            if literal not in _level_ranks:
+                raise ValueError("unknown level '%s', levels are %s" % (literal, ', '.join(_level_ranks)))
+            rank = self._const(consts, _level_ranks[literal])
+            return '(ranks.get(%s, -1) %s %s)' % (value, _comparisons[self.op], rank)
+
+        if self.op in ('==', '!='):
+            if self.op == '!=':
+                return '(%s is not None and %s != %s)' % (value, value, self._const(consts, literal))
+            return '(%s == %s)' % (value, self._const(consts, literal))
+        names = {'<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+        return '%s(%s, %s)' % (names[self.op], value, self._const(consts, literal))
+
+    def needles(self) -> typing.Optional[typing.List[typing.Tuple[str, bool]]]:
+        if not isinstance(self.value, str) or self.value == '':
+            return None
+        if self.op == '==':
+            if self.operand in _raw_keys or self.operand.startswith('fields.'):
+                return [(self.value, True)]
+            # level of a line may come from 'FATAL: ' prefix of its message
+            if self.operand == 'level' and self.value != 'fatal':
+                return [(self.value, True)]
+            # message is stripped, so it's a part of json string only
+            if self.operand == 'message':
+                return [(self.value, False)]
+        if self.op == '~' and self.operand in ('message', 'caller', 'traceid', 'node', 'nodeid') and \
+                re.escape(self.value) == self.value:
+            return [(self.value, False)]
+        return None
+
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.child = child
+        self.cost = child.cost
+
+    def source(self, consts: typing.List[typing.Any]) -> str:
+        return '(not %s)' % self.child.source(consts)
+
+
+class BoolOp(Node):
+    # operands are pure, so they are checked cheapest first
+    def __init__(self, op: str, children: typing.List[Node]):
+        self.op = op
+        self.children = sorted(children, key=lambda child: child.cost)
+        self.cost = sum(child.cost for child in children)
+
+    def source(self, consts: typing.List[typing.Any]) -> str:
+        return '(%s)' % (' %s ' % self.op).join(child.source(consts) for child in self.children)
+
+    def needles(self) -> typing.Optional[typing.List[typing.Tuple[str, bool]]]:
+        if self.op == 'or':
+            # line has to match one of them
+            rv = []
+            for child in self.children:
+                needles = child.needles()
+                if needles is None:
+                    return None
+                rv.extend(needles)
+            return rv
+        return None
+
+    def groups(self) -> typing.List[typing.List[typing.Tuple[str, bool]]]:
+        return [needles for needles in (child.needles() for child in self.children) if needles is not None]
+
+
+class Parser(object):
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _tokens.match(text, position)
+            if match is None or match.end() == position:
+                raise ValueError("unexpected '%s' at %d" % (text[position:].lstrip()[:10], position))
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup), position))
+            position = match.end()
+        self.position = 0
+
+    def _peek(self) -> typing.Optional[typing.Tuple[str, str, int]]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _next(self, expected: str) -> typing.Tuple[str, str, int]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("unexpected end of expression, %s expected" % expected)
+        self.position += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self._or()
+        token = self._peek()
+        if token is not None:
+            raise ValueError("unexpected '%s' at %d" % (token[1], token[2]))
+        return node
+
+    def _or(self) -> Node:
+        children = [self._and()]
+        while self._peek() is not None and self._peek()[1] == '||':
+            self.position += 1
+            children.append(self._and())
+        return children[0] if len(children) == 1 else BoolOp('or', children)
+
+    def _and(self) -> Node:
+        children = [self._unary()]
+        while self._peek() is not None and self._peek()[1] == '&&':
+            self.position += 1
+            children.append(self._unary())
+        return children[0] if len(children) == 1 else BoolOp('and', children)
+
+    def _unary(self) -> Node:
+        kind, value, position = self._next('operand')
+        if kind == 'op' and value == '!':
+            return Not(self._unary())
+        if kind == 'op' and value == '(':
+            node = self._or()
+            kind, value, position = self._next("')'")
+            if value != ')':
+                raise ValueError("')' expected at %d" % position)
+            return node
+        if kind != 'word':
+            raise ValueError("operand expected at %d, got '%s'" % (position, value))
+
+        operand = value
+        kind, op, position = self._next('operator')
+        if kind != 'op' or op not in _comparisons and op not in ('~', '!~'):
+            raise ValueError("comparison expected at %d, got '%s'" % (position, op))
+        return Compare(operand, op, self._value())
+
+    def _value(self) -> typing.Any:
+        kind, value, position = self._next('value')
+        if kind == 'string':
+            return json.loads(value)
+        if kind == 'number':
+            return float(value) if '.' in value else int(value)
+        if kind == 'word':
+            return value
+        raise ValueError("value expected at %d, got '%s'" % (position, value))
+
+
+class Where(object):
+    # --where expression compiled into a single python function of a LogLine
+    text: str
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tree = Parser(text).parse()
+
+        consts = []
+        source = 'lambda line: ' + self.tree.source(consts)
+        namespace = {'c%d' % i: value for i, value in enumerate(consts)}
+        namespace.update(ranks=_level_ranks, search=_search, contains=_contains,
+                         lt=_ordered(operator.lt), le=_ordered(operator.le),
+                         gt=_ordered(operator.gt), ge=_ordered(operator.ge))
+        self.check = eval(compile(source, '<where>', 'eval'), namespace)
+
+    def __call__(self, line: LogLine) -> bool:
+        return self.check(line)
+
+    # compiled function isn't picklable, worker processes compile it again
+    def __getstate__(self):
+        return self.text
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def add_prechecks(self, prefilter):
+        # substrings that json of a matching line must contain go to Prefilter, so lines
+        # without them aren't decoded at all
+        if isinstance(self.tree, BoolOp) and self.tree.op == 'and':
+            groups = self.tree.groups()
+        else:
+            needles = self.tree.needles()
+            groups = [] if needles is None else [needles]
+
+        for needles in groups:
+            prefilter.require_any([needle for needle, _ in needles], quoted=[quoted for _, quoted in needles])
@@ -4,8 +4,18 @@ import argparse
 import sys
 
 from lib.filter import FilterOptions
-from printer.log import Printer
-from input.log import SingleReader
+from printer.log import new_printer
+from input.cache import CachedReader
+from input.common import expand_inputs
+from input.compress import open_logs
+from input.follow import FollowReader
+from input.parallel import new_reader
+from input.prefilter import Prefilter
+from input.profile import StageProfile
+from input.seek import RangeReader
+from line.timestamp import epoch_ns
+from line.where import Where
+from input.merge import MergeReader
 
 
 def prepare_parser():
@@ -36,24 +46,94 @@ def prepare_parser():
         default=[],
         help='show only messages that contains string'
     )
+    parser.add_argument(
+        '--filter-traceid',
+        action='append',
+        default=[],
+        help='show only lines with given traceid'
+    )
     parser.add_argument(
         '--assume-sorted',
         action='store_false',
         default=True,
         help='disable sorting of input'
     )
+    parser.add_argument(
+        '--sort-memory',
+        type=int,
+        default=1024,
+        help='megabytes of lines kept in memory while sorting, the rest is spilled to temporary files'
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        default=False,
+        help='keep decoded lines of input files in <file>.lpcache next to them and reuse them next time'
+    )
     parser.add_argument(
         '--use-nodeid',
         action='store_true',
         default=False,
         help='enable using of nodeid instead of input'
     )
+    parser.add_argument(
+        '--where',
+        default=None,
+        help='show only lines matching the expression, e.g. level>=warn && fields.pulse>65537 && message~"timeout"'
+    )
+    parser.add_argument(
+        '--since',
+        default=None,
+        help='show only lines logged at or after the time (RFC3339), time ordered files are searched for it'
+    )
+    parser.add_argument(
+        '--until',
+        default=None,
+        help='show only lines logged before the time (RFC3339)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='number of processes used to parse input'
+    )
+    parser.add_argument(
+        '--follow', '-f',
+        action='store_true',
+        default=False,
+        help='follow growing (and rotated) logs of given files and directories, like tail -F'
+    )
+    parser.add_argument(
+        '--reorder-window',
+        type=int,
+        default=500,
+        help='in follow mode lines are held for that many milliseconds to be ordered by timestamp'
+    )
+    parser.add_argument(
+        '--output',
+        choices=['text', 'ndjson'],
+        default='text',
+        help='output format, ndjson is one normalized json object per line'
+    )
+    parser.add_argument(
+        '--profile-stages',
+        action='store_true',
+        default=False,
+        help='time stages of reading and count lines through them, the report is printed to stderr at exit'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
         default=False,
         help='verbose'
     )
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        default=[],
+        help='log files (or directories with them) sorted by time, merged by timestamp; stdin if empty. '
+             'Compressed (gz, xz, bz2) and rotated (<name>.log.<N>) files are read as one log per name'
+    )
     return parser
 
 
@@ -62,14 +142,65 @@ def main() -> int:
     args = parser.parse_args()
 
     filter_options = FilterOptions(args)
-    reader = SingleReader(sys.stdin, filter_options, debug=args.verbose)
-    printer = Printer(sys.stdout, args, filter_options)
+    prefilter = Prefilter.from_args(args)
+    since, until = None, None
+    try:
+        if args.since is not None:
+            since = epoch_ns(args.since)
+        if args.until is not None:
+            until = epoch_ns(args.until)
+    except Exception:
+        parser.error('--since and --until take RFC3339 time, like 2019-09-10T15:04:05Z')
+
+    where = None
+    if args.where is not None:
+        try:
+            where = Where(args.where)
+        except ValueError as e:
+            parser.error('--where: %s' % str(e))
+        where.add_prechecks(prefilter)
+    profile = StageProfile() if args.profile_stages else None
+    # time range is checked for every line by readers too, files are just not read outside of it
+    reader_kwargs = dict(debug=args.verbose, prefilter=prefilter, where=where, since=since, until=until,
+                         profile=profile)
+    printer = new_printer(sys.stdout, args, filter_options)
+    if profile is not None:
+        printer.print_line = profile.stage('print', printer.print_line, filters=False)
+
+    if args.follow and len(args.inputs) == 0:
+        parser.error('--follow requires files or directories to follow')
+
+    try:
+        if args.follow:
+            reader = FollowReader(args.inputs, filter_options, window=args.reorder_window / 1000, **reader_kwargs)
+            for line in reader.read_generator():
+                printer.print_line(line)
+            return 0
+
+        if len(args.inputs) > 0:
+            if args.cache:
+                inputs = [CachedReader(paths, filter_options, **reader_kwargs) for paths in expand_inputs(args.inputs)]
+            elif since is not None or until is not None:
+                inputs = [RangeReader(paths, filter_options, **reader_kwargs)
+                          for paths in expand_inputs(args.inputs)]
+            else:
+                inputs = [open_logs(paths) for paths in expand_inputs(args.inputs)]
+            reader = MergeReader(inputs, filter_options, jobs=args.jobs, **reader_kwargs)
+            for line in reader.read_generator():
+                printer.print_line(line)
+            return 0
 
-    if args.assume_sorted:
-        for line in reader.read_generator():
-            printer.print_line(line)
-    else:
-        printer.print_lines(reader.read_sorted())
+        reader = new_reader(sys.stdin, filter_options, args.jobs, sort_memory=args.sort_memory * 1024 * 1024,
+                            **reader_kwargs)
+        if args.assume_sorted:
+            for line in reader.read_generator():
+                printer.print_line(line)
+        else:
+            printer.print_lines(reader.read_sorted())
+    finally:
+        printer.flush()
+        if profile is not None:
+            profile.report(sys.stderr)
 
     return 0
 
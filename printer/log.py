@@ -1,7 +1,9 @@
 import sys
 import typing
 
+from input.common import json_dumps
 from line.log import LogLine, NodeList, RawLine
+from line.timestamp import clock
 
 try:
     from termcolor import colored
@@ -14,8 +16,51 @@ except ImportError:
         return string
 
 
+class OutputBuffer(object):
+    # rendered lines are written in batches, a terminal gets every line as soon as it's ready
+    output: typing.TextIO
+
+    def __init__(self, output: typing.TextIO, batch_size: int = 256 * 1024):
+        self.output = output
+        self.batch_size = batch_size
+        if output.isatty():
+            self.batch_size = 0
+        self.pending = []
+        self.pending_size = 0
+
+    def write(self, text: str):
+        if self.batch_size == 0:
+            self.output.write(text)
+            self.output.flush()
+            return
+
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.batch_size:
+            self.output.write(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def flush(self):
+        if len(self.pending) > 0:
+            self.output.write(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.output.flush()
+
+
+_levels = {
+    'error': ('ERR', 'red'),
+    'info': ('INF', 'yellow', None, ['bold']),
+    'debug': ('DBG', 'yellow'),
+    'warn': ('WRN', 'magenta'),
+    'panic': ('FTL', 'black', 'on_red'),
+}
+
+
 class Printer(object):
     output: typing.TextIO
+    buffer: OutputBuffer
 
     last_node: str
     nodes: NodeList
@@ -24,6 +69,10 @@ class Printer(object):
         self.output = output
         if self.output is None:
             self.output = sys.stdout
+        self.buffer = OutputBuffer(self.output)
+        if getattr(settings, 'follow', False):
+            # nobody wants to wait for a batch of a live log
+            self.buffer.batch_size = 0
 
         self.last_node = ""
         self.nodes = NodeList()
@@ -38,53 +87,68 @@ class Printer(object):
         else:
             self.colored = True
 
+        # everything that doesn't depend on a line is rendered once
+        self.levels = {}
+        self.field_plans = {}
+        self.field_plans_size = 4096
+        self.field_plan_hits = 0
+        self.field_plan_misses = 0
+        self.message_prefix, self.message_suffix = self._colored('\0', 'cyan').split('\0')
+        self.fields_open = self._colored('[', 'green')
+        self.fields_close = self._colored(']', 'green')
+
     def _colored(self, string: str, *args, **kwargs) -> str:
         if not self.colored:
             return string
         return colored(string, *args, **kwargs)
 
-    def _print_level(self, level):
-        if level == 'error':
-            text = self._colored('ERR', 'red')
-        elif level == 'info':
-            text = self._colored('INF', 'yellow', attrs=['bold'])
-        elif level == 'debug':
-            text = self._colored('DBG', 'yellow')
-        elif level == 'warn':
-            text = self._colored('WRN', 'magenta')
-        elif level == 'panic':
-            text = self._colored('FTL', 'black', 'on_red')
-        else:
-            text = self._colored(level, 'yellow')
+    def _render_level(self, level) -> str:
+        text = self.levels.get(level, None)
+        if text is None:
+            if level in _levels:
+                text = self._colored(*_levels[level])
+            else:
+                text = self._colored(level, 'yellow')
+            self.levels[level] = text
+        return text
 
-        self.output.write(text)
+    def _field_plan(self, fields) -> typing.List[typing.Tuple[str, str]]:
+        # lines of the same caller mostly come with the same keys, so their order and labels
+        # are computed once per key set; whether to skip a field depends on its value too
+        keys = frozenset(fields.keys())
+        plan = self.field_plans.get(keys, None)
+        if plan is not None:
+            self.field_plan_hits += 1
+            return plan
 
-    def _print_fields(self, fields):
-        field_keys = []
-        for field in sorted(fields.keys()):
-            if not self.filter.skip_field(field, fields[field]):
-                field_keys.append(field)
+        self.field_plan_misses += 1
+        plan = []
+        for key in sorted(keys):
+            plan.append((key, self._colored(str(key), 'green')))
 
-        if len(field_keys) == 0:
-            return
+        if len(self.field_plans) >= self.field_plans_size:
+            self.field_plans.clear()
+        self.field_plans[keys] = plan
+        return plan
 
-        self.output.write(self._colored('[', 'green'))
-        first = True
-        for key in field_keys:
-            if not first:
-                self.output.write(', ')
+    def _render_fields(self, fields) -> str:
+        rendered = []
+        skip_field = self.filter.skip_field
+        for key, label in self._field_plan(fields):
+            value = fields[key]
+            if skip_field(key, value):
+                continue
+            if isinstance(value, str) and value.startswith('insolar:'):
+                value = self.nodes.emoji_get(value)
             else:
-                first = False
+                value = repr(value)
+            rendered.append(label + '=' + value)
 
-            self.output.write(self._colored(str(key), 'green'))
-            self.output.write('=')
-            if isinstance(fields[key], str) and fields[key].startswith('insolar:'):
-                self.output.write(self.nodes.emoji_get(fields[key]))
-            else:
-                self.output.write(repr(fields[key]))
-        self.output.write(self._colored(']', 'green'))
+        if len(rendered) == 0:
+            return ''
+        return self.fields_open + ', '.join(rendered) + self.fields_close
 
-    def _print_header(self, line: LogLine):
+    def _render_header(self, line: LogLine) -> str:
         node_id = line.node
         role = line.role
         pulse = line.pulse
@@ -109,27 +173,92 @@ class Printer(object):
             node.pulse = pulse
 
         if new_node or new_pulse:
-            self.output.write('\nNode %s - %s - %s ===\n' % (node.emoji, role, pulse))
+            return '\nNode %s - %s - %s ===\n' % (node.emoji, role, pulse)
+        return ''
 
-    def print_line(self, line: typing.Union[LogLine, RawLine]):
+    def render_line(self, line: typing.Union[LogLine, RawLine]) -> str:
         # format is like <path>/<instance>/output.log:<line>:<datetime> <LVL> <message>
         if isinstance(line, RawLine):
-            self.output.write(self._colored(line.message, 'cyan'))
-            self.output.write('\n')
-        else:
-            self._print_header(line)
-            self.output.write('[')
-            self.output.write(line.timestamp.strftime('%H:%M:%S.%f'))
-            self.output.write(', ')
-            self._print_level(line.level)
-            self.output.write('] - ')
-            self.output.write(self._colored(line.message, 'cyan'))
-            self.output.write(' ')
-            self._print_fields(line.fields)
-            self.output.write('\n')
-            if line.backtrace is not None:
-                self.output.write(line.backtrace)
+            return self.message_prefix + line.message + self.message_suffix + '\n'
+
+        time = clock(line.timestamp_raw)
+        if time is None:
+            time = line.timestamp.strftime('%H:%M:%S.%f')
+        text = '%s[%s, %s] - %s%s%s %s\n' % (
+            self._render_header(line), time, self._render_level(line.level),
+            self.message_prefix, line.message, self.message_suffix, self._render_fields(line.fields),
+        )
+        if line.backtrace is not None:
+            text += line.backtrace
+        return text
+
+    def print_line(self, line: typing.Union[LogLine, RawLine]):
+        self.buffer.write(self.render_line(line))
 
     def print_lines(self, lines):
         for line in lines:
             self.print_line(line)
+
+    def flush(self):
+        self.buffer.flush()
+        if getattr(self.settings, 'verbose', False):
+            lookups = self.field_plan_hits + self.field_plan_misses
+            if lookups > 0:
+                print("field plans: %d hits, %d misses (%.1f%% hit rate)" % (
+                    self.field_plan_hits, self.field_plan_misses, 100.0 * self.field_plan_hits / lookups,
+                ), file=sys.stderr)
+
+
+class NDJSONPrinter(object):
+    # one json object per line with the same names for the same things in every line,
+    # raw lines become {"raw": <line>}
+    output: typing.TextIO
+    buffer: OutputBuffer
+
+    def __init__(self, output: typing.Optional[typing.TextIO], settings, filter_options):
+        self.output = output
+        if self.output is None:
+            self.output = sys.stdout
+        self.buffer = OutputBuffer(self.output)
+        if getattr(settings, 'follow', False):
+            # nobody wants to wait for a batch of a live log
+            self.buffer.batch_size = 0
+
+        self.settings = settings
+        self.filter = filter_options
+
+    def render_line(self, line: typing.Union[LogLine, RawLine]) -> str:
+        if isinstance(line, RawLine):
+            return json_dumps({'raw': line.message}) + '\n'
+
+        attributes = (
+            ('time', line.timestamp_raw),
+            ('level', line.level),
+            ('nodeid', line.node),
+            ('role', line.role),
+            ('caller', line.caller),
+            ('message', line.message),
+            ('pulse', line.pulse),
+            ('backtrace', line.backtrace),
+        )
+        out = {key: value for key, value in attributes if value is not None}
+        for key, value in line.fields.items():
+            if key not in out and not self.filter.skip_field(key, value):
+                out[key] = value
+        return json_dumps(out) + '\n'
+
+    def print_line(self, line: typing.Union[LogLine, RawLine]):
+        self.buffer.write(self.render_line(line))
+
+    def print_lines(self, lines):
+        for line in lines:
+            self.print_line(line)
+
+    def flush(self):
+        self.buffer.flush()
+
+
+def new_printer(output: typing.Optional[typing.TextIO], settings, filter_options) -> typing.Union[Printer, NDJSONPrinter]:
+    if getattr(settings, 'output', 'text') == 'ndjson':
+        return NDJSONPrinter(output, settings, filter_options)
+    return Printer(output, settings, filter_options)
@@ -5,7 +5,15 @@ import sys
 
 from lib.filter import FilterOptions
 from line.log import LogLine
-from input.log import SingleReader
+from aggregator.checkpoint import Checkpoint
+from input.cache import CachedReader
+from input.common import expand_inputs
+from input.compress import open_logs
+from input.merge import MergeReader
+from input.parallel import new_reader
+from input.prefilter import Prefilter
+from input.profile import StageProfile
+from line.where import Where
 from lib.sm_stat import SMTraceIDAnalyzer
 
 
@@ -37,12 +45,52 @@ def prepare_parser():
         default=[],
         help='show only messages that contains string'
     )
+    parser.add_argument(
+        '--filter-traceid',
+        action='append',
+        default=[],
+        help='show only lines with given traceid'
+    )
+    parser.add_argument(
+        '--where',
+        default=None,
+        help='analyze only lines matching the expression, e.g. level>=warn && fields.pulse>65537 && message~"timeout"'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='number of processes used to parse input'
+    )
+    parser.add_argument(
+        '--checkpoint',
+        default=None,
+        help='file to keep the analyzer state in, next run with it analyzes only lines added to input files since'
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        default=False,
+        help='keep decoded lines of input files in <file>.lpcache next to them and reuse them next time'
+    )
+    parser.add_argument(
+        '--profile-stages',
+        action='store_true',
+        default=False,
+        help='time stages of reading and analysis and count lines through them, the report is printed to stderr'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
         default=False,
         help='verbose'
     )
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        default=[],
+        help='log files (or directories with them), merged by timestamp; stdin if empty'
+    )
     return parser
 
 
@@ -51,14 +99,53 @@ def main() -> int:
     args = parser.parse_args()
 
     filter_options = FilterOptions(args)
-    reader = SingleReader(sys.stdin, filter_options, debug=args.verbose)
-    smstat = SMTraceIDAnalyzer()
+    prefilter = Prefilter.from_args(args)
+    where = None
+    if args.where is not None:
+        try:
+            where = Where(args.where)
+        except ValueError as e:
+            parser.error('--where: %s' % str(e))
+        where.add_prechecks(prefilter)
+    profile = StageProfile() if args.profile_stages else None
+    reader_kwargs = dict(debug=args.verbose, prefilter=prefilter, where=where, profile=profile)
+    if args.checkpoint is not None and len(args.inputs) == 0:
+        parser.error('--checkpoint requires input files')
+
+    checkpoint = None
+    resumed = False
+    if args.checkpoint is not None:
+        groups = expand_inputs(args.inputs)
+        # lines that the analyzer gets depend on these
+        settings = (args.skip_field, args.skip_caller, args.filter_message, args.filter_traceid, args.where)
+        checkpoint = Checkpoint.load(args.checkpoint, settings, debug=args.verbose)
+        resumed = checkpoint.resume([path for paths in groups for path in paths], debug=args.verbose)
+        inputs = checkpoint.readers(groups, filter_options, **reader_kwargs)
+        reader = MergeReader(inputs, filter_options, jobs=args.jobs, **reader_kwargs)
+    elif len(args.inputs) == 0:
+        reader = new_reader(sys.stdin, filter_options, args.jobs, **reader_kwargs)
+    elif args.cache:
+        inputs = [CachedReader(paths, filter_options, **reader_kwargs) for paths in expand_inputs(args.inputs)]
+        reader = MergeReader(inputs, filter_options, jobs=args.jobs, **reader_kwargs)
+    else:
+        inputs = [open_logs(paths) for paths in expand_inputs(args.inputs)]
+        reader = MergeReader(inputs, filter_options, jobs=args.jobs, **reader_kwargs)
+
+    smstat = checkpoint.analyzer if resumed else SMTraceIDAnalyzer()
 
+    process_line = smstat.process_line
+    if profile is not None:
+        process_line = profile.stage('analyze', process_line, filters=False)
     for line in reader.read_generator():
         if isinstance(line, LogLine):
-            smstat.process_line(line)
+            process_line(line)
 
+    if checkpoint is not None:
+        checkpoint.analyzer = smstat
+        checkpoint.save()
     smstat.long_output()
+    if profile is not None:
+        profile.report(sys.stderr)
     return 0
 
 
@@ -3,30 +3,89 @@
 import argparse
 import sys
 
-from aggregator.run import OverallInformation
+from aggregator.run import OverallInformation, Run, StreamingInformation, TestFiles
 from input.test import TestReader
 
 
 def prepare_parser():
     parser = argparse.ArgumentParser(description='Parse JSON test output of insolar')
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        default=False,
+        help='print failures as soon as they happen and keep output of running tests only'
+    )
+    parser.add_argument(
+        '--max-output',
+        type=int,
+        default=10000,
+        help='in stream mode only that many last output lines of every test run are kept, 0 keeps all'
+    )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        default=False,
+        help='decode events by go test -json schema as they are, without checks for unknown and duplicate keys'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='number of processes used to parse input files'
+    )
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        default=[],
+        help='go test -json output files (e.g. one per package), packages are merged into one report; stdin if empty'
+    )
     return parser
 
 
+def print_failed(run: Run):
+    print("FAIL: %s" % run.name)
+    print("=" * 80)
+    if run.dropped > 0:
+        print("... %d lines dropped" % run.dropped)
+    for out in run.output:
+        print(out)
+
+
 def main() -> int:
     parser = prepare_parser()
     args = parser.parse_args()
 
-    reader = TestReader(None, debug=True)
+    def on_failed(run: Run):
+        print_failed(run)
+        sys.stdout.flush()
+
+    reader_kwargs = dict(debug=True, strict=not args.fast)
+    if len(args.inputs) > 0:
+        files = TestFiles(args.inputs, args.jobs, **reader_kwargs)
+        if args.stream:
+            for run in files.failed(args.max_output):
+                on_failed(run)
+            return 0
+        for run in files.information().brief_failed():
+            print_failed(run)
+        return 0
+
+    reader = TestReader(None, **reader_kwargs)
+
+    if args.stream:
+        info = StreamingInformation(on_failed, args.max_output)
+        for line in reader.read_generator():
+            info.add_event(line)
+        info.finish()
+        return 0
+
     info = OverallInformation()
 
     for line in reader.read_generator():
         info.add_event(line)
     brief = info.brief_failed()
     for run in brief:
-        print("FAIL: %s" % run.name)
-        print("=" * 80)
-        for out in run.output:
-            print(out)
+        print_failed(run)
 
     return 0
 
@@ -0,0 +1,35 @@
+import unittest
+
+from input.profile import StageProfile
+
+
+class TestStageProfile(unittest.TestCase):
+    def test_take_twice(self):
+        profile = StageProfile()
+        accept = profile.stage('filter', lambda line: line if line > 0 else None)
+
+        for line in (1, 0, 2):
+            accept(line)
+        profile.fail('bad json')
+        stages, failures = profile.take()
+        self.assertEqual(stages['filter'][:2], [3, 2])
+        self.assertEqual(failures, {'bad json': 1})
+
+        for line in (3, -1):
+            accept(line)
+        stages, failures = profile.take()
+        self.assertEqual(stages['filter'][:2], [2, 1])
+        self.assertEqual(failures, {})
+
+    def test_add_taken(self):
+        worker, total = StageProfile(), StageProfile()
+        read = worker.stage('read', lambda line: line, filters=False)
+        for _ in range(2):
+            read(None)
+            read(None)
+            total.add(worker.take())
+        self.assertEqual(total.stages['read'][:2], [4, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
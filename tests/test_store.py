@@ -0,0 +1,46 @@
+import unittest
+
+from line import store
+from line.store import LineStore
+
+
+class TestLineStore(unittest.TestCase):
+    def _store(self) -> LineStore:
+        lines = LineStore()
+        for offset, trace_id in enumerate(['a', 'b', 'a', 'c', 'b']):
+            lines.append(trace_id, offset * 10)
+        return lines
+
+    def test_select(self):
+        lines = self._store()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines.select({'a', 'c'}), [(0, 'a'), (20, 'a'), (30, 'c')])
+        self.assertEqual(lines.select({'x'}), [])
+
+    def test_select_without_numpy(self):
+        numpy, store.numpy = store.numpy, None
+        try:
+            self.assertEqual(self._store().select({'b'}), [(10, 'b'), (40, 'b')])
+        finally:
+            store.numpy = numpy
+
+    def test_state(self):
+        state = self._store().__getstate__()
+        self.assertTrue(LineStore.is_state(state))
+        lines = LineStore.__new__(LineStore)
+        lines.__setstate__(state)
+        self.assertEqual(lines.select({'b'}), [(10, 'b'), (40, 'b')])
+        lines.append('d', 50)
+        self.assertEqual(lines.select({'d'}), [(50, 'd')])
+
+    def test_broken_state(self):
+        offsets, traceids, values = self._store().__getstate__()
+        self.assertFalse(LineStore.is_state((offsets, traceids, values[:2])))
+        self.assertFalse(LineStore.is_state((offsets[:8], traceids, values)))
+        self.assertFalse(LineStore.is_state((offsets, traceids, values + ['a'])))
+        self.assertFalse(LineStore.is_state((offsets, traceids, [1, 2, 3])))
+        self.assertFalse(LineStore.is_state([offsets, traceids, values]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import pickle
+import unittest
+
+from input.prefilter import Prefilter
+from line.log import LogLine
+from line.where import BoolOp, Compare, Not, Parser, Where
+
+
+def _line(**kwargs) -> LogLine:
+    line = {
+        'level': 'info',
+        'nodeid': 'insolar:1AAEAA',
+        'role': 'virtual',
+        'time': '2019-09-10T15:04:05.000000000Z',
+        'caller': 'network/servicenetwork.go:10',
+        'message': 'state machine moved',
+        'traceid': 'trace-1',
+        'pulse': 65537,
+    }
+    line.update(kwargs)
+    return LogLine(line)
+
+
+class WhereTestCase(unittest.TestCase):
+    def assertInvalid(self, text: str, message: str):
+        with self.assertRaises(ValueError) as raised:
+            Where(text)
+        self.assertIn(message, str(raised.exception))
+
+
+class TestPrecedence(unittest.TestCase):
+    def test_and_binds_tighter_than_or(self):
+        tree = Parser('level==warn || level==info && role==light').parse()
+        self.assertIsInstance(tree, BoolOp)
+        self.assertEqual(tree.op, 'or')
+        self.assertEqual(sorted(type(child).__name__ for child in tree.children), ['BoolOp', 'Compare'])
+
+        where = Where('level==warn || level==info && role==light')
+        self.assertTrue(where(_line(level='warn', role='virtual')))
+        self.assertFalse(where(_line(level='info', role='virtual')))
+        self.assertTrue(where(_line(level='info', role='light')))
+
+    def test_parentheses(self):
+        where = Where('(level==warn || level==info) && role==light')
+        self.assertFalse(where(_line(level='warn', role='virtual')))
+        self.assertTrue(where(_line(level='warn', role='light')))
+
+    def test_not_binds_tighter_than_and(self):
+        tree = Parser('!level==warn && role==light').parse()
+        self.assertEqual(tree.op, 'and')
+        self.assertTrue(any(isinstance(child, Not) for child in tree.children))
+
+        where = Where('!level==warn && role==light')
+        self.assertTrue(where(_line(level='info', role='light')))
+        self.assertFalse(where(_line(level='warn', role='light')))
+        self.assertFalse(where(_line(level='info', role='virtual')))
+
+    def test_not_of_group(self):
+        where = Where('!(level==warn || role==light)')
+        self.assertTrue(where(_line(level='info', role='virtual')))
+        self.assertFalse(where(_line(level='info', role='light')))
+
+    def test_cheap_operands_go_first(self):
+        tree = Parser('fields.code==5 && message~"x" && level==info').parse()
+        self.assertEqual([child.operand for child in tree.children], ['level', 'message', 'fields.code'])
+
+
+class TestValues(WhereTestCase):
+    def test_quoted_operators_are_text(self):
+        where = Where('message=="a && b || !c"')
+        self.assertTrue(where(_line(message='a && b || !c')))
+        self.assertFalse(where(_line(message='a b c')))
+
+    def test_escaped_quotes(self):
+        where = Where(r'message=="say \"hi\""')
+        self.assertTrue(where(_line(message='say "hi"')))
+
+    def test_bare_words(self):
+        where = Where('node==insolar:1AAEAA && role==virtual && fields.name==some-name.v2')
+        self.assertTrue(where(_line(name='some-name.v2')))
+        # paths have to be quoted
+        self.assertInvalid('caller==network/servicenetwork.go', "unexpected '/")
+
+    def test_numbers_and_strings_differ(self):
+        self.assertTrue(Where('fields.code==5')(_line(code=5)))
+        self.assertFalse(Where('fields.code==5')(_line(code='5')))
+        self.assertTrue(Where('fields.code=="5"')(_line(code='5')))
+        self.assertTrue(Where('fields.ratio>0.5')(_line(ratio=0.75)))
+        self.assertTrue(Where('pulse>=65537 && pulse<65538')(_line()))
+
+    def test_missing_values_never_match(self):
+        for text in ('fields.code==5', 'fields.code!=5', 'fields.code<5', 'fields.code~"5"', 'fields.code!~"5"',
+                     'fields.code!~"^5$"'):
+            self.assertFalse(Where(text)(_line()), text)
+        self.assertTrue(Where('fields.code!~"5"')(_line(code='6')))
+
+    def test_incomparable_values(self):
+        self.assertFalse(Where('fields.code>5')(_line(code='text')))
+
+    def test_regexp(self):
+        where = Where('caller~"^network/"')
+        self.assertTrue(where(_line()))
+        self.assertFalse(where(_line(caller='ledger/network/x.go')))
+        self.assertTrue(Where('caller!~"^ledger/"')(_line()))
+
+    def test_levels(self):
+        where = Where('level>=warn')
+        self.assertFalse(where(_line(level='info')))
+        self.assertTrue(where(_line(level='error')))
+        self.assertTrue(where(_line(message='FATAL: oops')))
+        self.assertFalse(where(_line(level='unknown')))
+
+    def test_time(self):
+        where = Where('time>="2019-09-10T15:04:05Z" && time<"2019-09-10T18:04:06+03:00"')
+        self.assertTrue(where(_line()))
+        self.assertFalse(where(_line(time='2019-09-10T15:04:06.000000001Z')))
+
+
+class TestErrors(WhereTestCase):
+    def test_errors(self):
+        self.assertInvalid('color==red', "unknown operand 'color'")
+        self.assertInvalid('fields.==red', "unknown operand 'fields.'")
+        self.assertInvalid('level==', 'unexpected end of expression, value expected')
+        self.assertInvalid('level', 'unexpected end of expression, operator expected')
+        self.assertInvalid('', 'unexpected end of expression, operand expected')
+        self.assertInvalid('(level==info', "unexpected end of expression, ')' expected")
+        self.assertInvalid('level==info)', "unexpected ')'")
+        self.assertInvalid('level==info role==x', "unexpected 'role'")
+        self.assertInvalid('level==info && && role==x', 'operand expected')
+        self.assertInvalid('level && role==x', 'comparison expected')
+        self.assertInvalid('level==(', 'value expected')
+        self.assertInvalid('level==info $', "unexpected '$'")
+        self.assertInvalid('message=="open', "unexpected '\"open'")
+        self.assertInvalid('message~"("', 'invalid regexp')
+        self.assertInvalid('fields.code~5', "'~' needs a string")
+        self.assertInvalid('level>=loud', "unknown level 'loud'")
+        self.assertInvalid('time>"yesterday"', "invalid time 'yesterday'")
+        self.assertInvalid('time>5', 'time is compared with RFC3339 strings')
+
+    def test_compare_rejects_unknown_operand(self):
+        with self.assertRaises(ValueError):
+            Compare('color', '==', 'red')
+
+
+class TestWhere(unittest.TestCase):
+    def test_pickle(self):
+        where = pickle.loads(pickle.dumps(Where('level>=warn && message~"x"')))
+        self.assertEqual(where.text, 'level>=warn && message~"x"')
+        self.assertTrue(where(_line(level='error', message='x')))
+
+    def test_prechecks_of_and(self):
+        prefilter = Prefilter()
+        Where('traceid==trace-1 && message~"moved" && level>=warn').add_prechecks(prefilter)
+        self.assertEqual(sorted(prefilter.groups), [('"trace-1"',), ('moved',)])
+
+    def test_prechecks_of_mixed_or(self):
+        prefilter = Prefilter()
+        Where('traceid==trace-1 || message~"moved"').add_prechecks(prefilter)
+        self.assertEqual(prefilter.groups, [('"trace-1"', 'moved')])
+        self.assertTrue(prefilter.check('{"traceid":"trace-1"}'))
+        self.assertTrue(prefilter.check('{"message":"it moved"}'))
+        self.assertFalse(prefilter.check('{"traceid":"trace-10"}'))
+
+    def test_no_prechecks(self):
+        for text in ('level>=warn', 'traceid==a || level>=warn', '!traceid==a', 'message=="a\\"b"'):
+            prefilter = Prefilter()
+            Where(text).add_prechecks(prefilter)
+            self.assertEqual(prefilter.groups, [], text)
+
+
+if __name__ == '__main__':
+    unittest.main()